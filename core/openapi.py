@@ -0,0 +1,84 @@
+"""Precomputed OpenAPI schema.
+
+The schema is generated from the code with ``manage.py openapi_schema`` at
+deploy time and committed as ``core/openapi/schema-<version>.json``. Requests
+are served from an in-memory copy of that file, so documentation traffic never
+introspects serializers or viewsets.
+"""
+import hashlib
+import logging
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = "v2.0"
+
+SCHEMA_PATH = settings.BASE_DIR / "core" / "openapi" / f"schema-{API_VERSION}.json"
+
+
+# drf_yasg's OpenAPI stack is heavy to import, so it is only loaded when the
+# schema is generated or the Swagger UI is first requested.
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Skill Up API",
+        default_version=API_VERSION,
+        description='Skill Up API endpoints',
+        contact=openapi.Contact(email='vanjo.mampusti0324@gmail.com'),
+    )
+
+
+@require_safe
+def swagger_ui(request):
+    """Render the Swagger UI page; the browser fetches the spec from ``schema-json``."""
+    from drf_yasg.renderers import SwaggerUIRenderer
+
+    # drf_yasg's own view generates the whole schema before rendering this page,
+    # so only its renderer's settings and template are reused here.
+    renderer = SwaggerUIRenderer()
+    context = {"request": request}
+    renderer.set_context(context)
+    context.update(title=api_info().title, version=API_VERSION)
+    return HttpResponse(render_to_string(renderer.template, context, request))
+
+
+def generate_schema():
+    """Introspect the URLconf and return the schema as JSON bytes."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    # An empty url keeps host/scheme out of the artifact so it is the same in every environment.
+    generator = OpenAPISchemaGenerator(api_info(), version=API_VERSION, url="")
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[], pretty=True).encode(schema)
+
+
+@lru_cache(maxsize=None)
+def stored_schema():
+    """Return (body, etag) for the committed schema, generating it if the file is missing."""
+    try:
+        body = SCHEMA_PATH.read_bytes()
+    except FileNotFoundError:
+        logger.warning("%s is missing; generating the OpenAPI schema in-process.", SCHEMA_PATH)
+        body = generate_schema()
+    return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+@require_safe
+def schema_json(request):
+    body, etag = stored_schema()
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=300)
+    return response
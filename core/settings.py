@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -79,13 +81,58 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+# The profile is picked from the environment: SKILLUP_DB_ENGINE is "sqlite"
+# (default) or "postgresql". Setting SKILLUP_DB_REPLICA_NAME adds a "replica"
+# alias that read-only API actions are routed to (see skillup_app.db_router);
+# two SQLite files are enough to exercise the routing locally.
+
+SQLITE_PRAGMAS = [
+    # WAL lets readers run while start/done requests write.
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+]
+
+
+def database_config(name, host=None):
+    if os.environ.get("SKILLUP_DB_ENGINE", "sqlite") == "postgresql":
+        pooled = os.environ.get("SKILLUP_DB_POOL") == "1"
+        return {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": name,
+            "USER": os.environ.get("SKILLUP_DB_USER", ""),
+            "PASSWORD": os.environ.get("SKILLUP_DB_PASSWORD", ""),
+            "HOST": host or os.environ.get("SKILLUP_DB_HOST", ""),
+            "PORT": os.environ.get("SKILLUP_DB_PORT", ""),
+            # Django's built-in pool (psycopg 3) replaces persistent connections.
+            "CONN_MAX_AGE": 0 if pooled else int(os.environ.get("SKILLUP_DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"pool": True} if pooled else {},
+        }
+    return {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": name,
+        "OPTIONS": {
+            "init_command": "; ".join(SQLITE_PRAGMAS),
+            # Take the write lock up front instead of failing to upgrade mid-transaction.
+            "transaction_mode": "IMMEDIATE",
+        },
     }
+
+
+DATABASES = {
+    "default": database_config(os.environ.get("SKILLUP_DB_NAME", BASE_DIR / "db.sqlite3")),
 }
 
+if os.environ.get("SKILLUP_DB_REPLICA_NAME"):
+    DATABASES["replica"] = database_config(
+        os.environ["SKILLUP_DB_REPLICA_NAME"], host=os.environ.get("SKILLUP_DB_REPLICA_HOST"),
+    )
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["skillup_app.db_router.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -118,10 +165,64 @@ USE_I18N = True
 USE_TZ = True
 
 
+# REST framework and JWT authentication
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "skillup_app.authentication.ClaimsJWTAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+    ],
+}
+
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
+    "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "skillup_app.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "skillup_app.serializers.ClaimsTokenRefreshSerializer",
+    # Embeds a hash of the password so a password change revokes issued tokens.
+    "CHECK_REVOKE_TOKEN": True,
+}
+
+SWAGGER_SETTINGS = {
+    # Swagger UI loads the committed schema (core/openapi.py) instead of
+    # asking drf_yasg to introspect every serializer on each page load.
+    "SPEC_URL": "schema-json",
+}
+
+# Seconds a worker trusts its cached is_active/is_staff/password check for a
+# token's user before querying the database again.
+SKILLUP_JWT_REVOCATION_TTL = 30
+
+# Password hashing processes an import_users job starts on the run_jobs host.
+SKILLUP_IMPORT_WORKERS = int(os.environ.get("SKILLUP_IMPORT_WORKERS", "2"))
+
+# Broker behind /events/. The in-process default only reaches SSE clients of
+# the same process, so events published from the run_jobs worker (such as
+# cohort assignments) are lost unless this points at a shared broker.
+SKILLUP_EVENT_BROKER = os.environ.get("SKILLUP_EVENT_BROKER", "skillup_app.events.InProcessBroker")
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = os.environ.get("SKILLUP_STATIC_ROOT", BASE_DIR / "staticfiles")
+STATICFILES_DIRS = [BASE_DIR / "static"]
+
+# collectstatic fingerprints and precompresses assets (run it before serving
+# with DEBUG off); skillup_app.staticfiles.serve_static serves the results.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "skillup_app.staticfiles.CompressedManifestStaticFilesStorage"},
+    # Files that must never be web-served, such as user import CSVs with passwords.
+    "private": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.environ.get("SKILLUP_PRIVATE_ROOT", BASE_DIR / "private")},
+    },
+}
+
+# Directories whose icons/*.svg are combined into <dir>/icons-sprite.svg.
+SKILLUP_SVG_SPRITES = ["assets/extensions/@icon/dripicons"]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
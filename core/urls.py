@@ -13,27 +13,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
-from rest_framework import permissions
+from skillup_app.staticfiles import serve_static
 
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Skill Up API",
-        default_version='v2.0',
-        description='Skill Up API endpoints',
-        contact=openapi.Contact(email='vanjo.mampusti0324@gmail.com'),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from .openapi import schema_json, swagger_ui
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    # The UI page only links to the precomputed schema below; neither view runs the generator.
+    path('swagger/', swagger_ui, name='schema-swagger-ui'),
+    path('swagger.json', schema_json, name='schema-json'),
+    # With DEBUG on, runserver serves static files from the finders before this is reached.
+    path(f"{settings.STATIC_URL.strip('/')}/<path:path>", serve_static, name='static'),
     path('', include('skillup_app.urls')),
 ]
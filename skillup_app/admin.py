@@ -1,20 +1,48 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.cache import cache
+from django.db import transaction
+from django.template.response import TemplateResponse
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 
-from .models import Profile, UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment
+from .events import publish_to_users
+from .forms import CohortForm
+from .jobs import enqueue
+from .models import Profile, UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment, Job
+from .paginators import EstimatedCountPaginator
+
+ORIGINAL_TEXT_CACHE_SECONDS = 60 * 60
+
+
+def cached_original_text(orig):
+    # Originals are never edited in place, so the file name identifies the content.
+    key = f"skillup:original-md:{orig.pk}:{orig.file.name}"
+    text = cache.get(key)
+    if text is None:
+        text = orig.read_text()
+        cache.set(key, text, ORIGINAL_TEXT_CACHE_SECONDS)
+    return text
 
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'position', 'department', 'lab_part')
     list_filter = ('position', 'department', 'lab_part')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(UploadedMarkdownFile)
 class UploadedMarkdownFileAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'uploaded_by', 'uploaded_at', 'create_modified_link')
+    list_select_related = ('uploaded_by',)
+    search_fields = ('title',)
+    autocomplete_fields = ('uploaded_by',)
     readonly_fields = ('uploaded_at',)
 
     def create_modified_link(self, obj):
@@ -25,6 +53,9 @@ class UploadedMarkdownFileAdmin(admin.ModelAdmin):
 @admin.register(ModifiedMarkdownFile)
 class ModifiedMarkdownFileAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'original', 'created_by', 'created_at')
+    list_select_related = ('original', 'created_by')
+    search_fields = ('title', 'original__title')
+    autocomplete_fields = ('original', 'created_by')
     readonly_fields = ('file', 'created_at')
     fields = ('original', 'title', 'content', 'file', 'created_by', 'created_at')
 
@@ -33,12 +64,13 @@ class ModifiedMarkdownFileAdmin(admin.ModelAdmin):
         original_id = request.GET.get('original')
         if original_id:
             try:
-                orig = UploadedMarkdownFile.objects.get(pk=original_id)
+                orig = UploadedMarkdownFile.objects.only('id', 'title', 'file').get(pk=original_id)
                 initial['original'] = orig.id
                 initial['title'] = f'Modified: {orig}'
-                initial['content'] = orig.read_text()
-            except UploadedMarkdownFile.DoesNotExist:
-                pass
+                initial['content'] = cached_original_text(orig)
+            except (UploadedMarkdownFile.DoesNotExist, ValueError):
+                # The autocomplete widget would query an invalid pk, so drop it.
+                initial.pop('original', None)
         return initial
 
     def save_model(self, request, obj, form, change):
@@ -51,17 +83,68 @@ class ModifiedMarkdownFileAdmin(admin.ModelAdmin):
 class TaskTemplateAdmin(admin.ModelAdmin):
     list_display = ('title', 'modified', 'is_active', 'created_by', 'created_at')
     list_filter = ('is_active',)
+    list_select_related = ('modified__original', 'created_by')
+    search_fields = ('title',)
+    autocomplete_fields = ('modified', 'created_by')
     readonly_fields = ('created_at',)
+    actions = ('assign_to_cohort',)
 
     def save_model(self, request, obj, form, change):
         if not change and not obj.created_by_id:
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+    @admin.action(description='Assign selected templates to a cohort')
+    def assign_to_cohort(self, request, queryset):
+        form = CohortForm(request.POST if 'apply' in request.POST else None)
+        if form.is_bound and form.is_valid():
+            for template_id in queryset.values_list('id', flat=True):
+                enqueue('assign_template', {'template_id': template_id, **form.cohort()}, user=request.user)
+            self.message_user(request, f'Queued cohort assignment for {queryset.count()} template(s).', messages.SUCCESS)
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Assign templates to a cohort',
+            'opts': self.model._meta,
+            'queryset': queryset,
+            'form': form,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/skillup_app/tasktemplate/assign_cohort.html', context)
+
 
 @admin.register(Assignment)
 class AssignmentAdmin(admin.ModelAdmin):
     list_display = ('template', 'student', 'status', 'assigned_at', 'started_at', 'completed_at')
     list_filter = ('status',)
+    list_select_related = ('template', 'student')
     search_fields = ('template__title', 'student__username')
+    autocomplete_fields = ('template', 'student')
     readonly_fields = ('assigned_at', 'started_at', 'completed_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('mark_done',)
+
+    @admin.action(description='Mark selected assignments as done')
+    def mark_done(self, request, queryset):
+        pending = queryset.filter(status__in=[Assignment.STATUS_ASSIGNED, Assignment.STATUS_IN_PROGRESS])
+        rows = list(pending.values_list('id', 'student_id', 'template_id'))
+        updated = pending.update(status=Assignment.STATUS_DONE, completed_at=timezone.now())
+
+        # A queryset update skips post_save, so publish the events here.
+        def publish():
+            for pk, student_id, template_id in rows:
+                publish_to_users([student_id], 'assignment.done',
+                                 {'id': pk, 'template': template_id, 'status': Assignment.STATUS_DONE})
+        transaction.on_commit(publish)
+        self.message_user(request, f'Marked {updated} assignment(s) as done.', messages.SUCCESS)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'progress', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    list_select_related = ('created_by',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SkillupAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "skillup_app"
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401  (registers signal receivers and job handlers)
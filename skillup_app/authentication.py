@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# user id -> (expires_at, is_active, is_staff, password hash), oldest first.
+_user_state_cache = OrderedDict()
+_user_state_lock = threading.Lock()
+USER_STATE_CACHE_SIZE = 10000
+
+
+def _user_state(user_id):
+    """Return the revocation-relevant fields of a user, cached briefly per process."""
+    now = time.monotonic()
+    cached = _user_state_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1:]
+    # Always the primary: a lagging replica would keep honouring revoked tokens.
+    row = (get_user_model().objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id)
+           .values_list("is_active", "is_staff", "password").first())
+    if row is None:
+        state = (False, False, None)
+    else:
+        state = (row[0], row[1], get_md5_hash_password(row[2]))
+    ttl = getattr(settings, "SKILLUP_JWT_REVOCATION_TTL", 30)
+    with _user_state_lock:
+        _user_state_cache.pop(user_id, None)
+        _user_state_cache[user_id] = (now + ttl,) + state
+        _prune_user_states(now)
+    return state
+
+
+def _prune_user_states(now):
+    # Every entry gets the same TTL, so the expired ones are at the front.
+    while _user_state_cache:
+        expires_at = next(iter(_user_state_cache.values()))[0]
+        if expires_at > now and len(_user_state_cache) <= USER_STATE_CACHE_SIZE:
+            return
+        _user_state_cache.popitem(last=False)
+
+
+def forget_user_state(user_id):
+    _user_state_cache.pop(user_id, None)
+
+
+class ClaimsUser(TokenUser):
+    """Stateless user built from the claims added by ``ClaimsTokenObtainPairSerializer``."""
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def position(self):
+        return self.token.get("position")
+
+    @cached_property
+    def department(self):
+        return self.token.get("department")
+
+    @cached_property
+    def lab_part(self):
+        return self.token.get("lab_part")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that skips the user query on read-only requests.
+
+    Safe methods get a ``ClaimsUser`` backed by the signed token claims; the only
+    database access is a per-process cached check that the user is still active
+    and has not changed password. If the staff flag no longer matches the token,
+    the real ``User`` is loaded instead. Writes always load the real ``User`` so
+    views can save it on foreign keys.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS:
+            return self.get_claims_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_claims_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token or "username" not in validated_token:
+            # Tokens issued without our claims fall back to the regular lookup.
+            return self.get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        is_active, is_staff, password_hash = _user_state(user.id)
+        if not is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        if is_staff != user.is_staff:
+            # The staff flag changed after the token was issued; trust the database
+            # until the client refreshes and gets current claims.
+            return self.get_user(validated_token)
+        return user
@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+
+_read_alias = ContextVar("skillup_read_alias", default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route ORM reads inside the block to the replica, when one is configured."""
+    alias = REPLICA_ALIAS if enabled and REPLICA_ALIAS in settings.DATABASES else None
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads to the replica only inside ``replica_reads`` blocks; writes always go to default.
+
+    Reads are not routed globally so a request that writes and then reads sees
+    its own changes instead of racing replication lag.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
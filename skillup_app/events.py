@@ -0,0 +1,111 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = "skillup_app.events.InProcessBroker"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class BaseSubscription:
+    async def get(self, timeout=None):
+        """Return the next event, or None if nothing arrived within ``timeout`` seconds."""
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class BaseBroker:
+    """Interface for event brokers.
+
+    The in-process broker only reaches clients connected to the same worker;
+    multi-worker deployments point ``SKILLUP_EVENT_BROKER`` at a subclass backed
+    by a shared transport (Redis pub/sub, Postgres LISTEN/NOTIFY, ...). So do
+    deployments that want events published by jobs: ``run_jobs`` is a separate
+    process that no SSE client is connected to.
+    """
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+
+class InProcessSubscription(BaseSubscription):
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=broker.max_queue)
+
+    def push(self, event):
+        # Called from any thread; drop events for clients that stopped reading.
+        def put():
+            if not self.queue.full():
+                self.queue.put_nowait(event)
+        self.loop.call_soon_threadsafe(put)
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(BaseBroker):
+    max_queue = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.push(event)
+            except RuntimeError:
+                # The subscriber's event loop is already closed.
+                subscription.close()
+
+    def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel)
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.channel]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, "SKILLUP_EVENT_BROKER", DEFAULT_BROKER))()
+
+
+def publish_to_users(user_ids, event_type, data):
+    broker = get_broker()
+    event = {"type": event_type, "data": data}
+    for user_id in set(user_ids):
+        broker.publish(user_channel(user_id), event)
+
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
@@ -0,0 +1,87 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .models import Assignment
+
+EXPORT_CHUNK_SIZE = 2000
+# Lines joined into each block handed across the thread boundary under ASGI.
+ASYNC_BLOCK_LINES = 500
+
+# (column name, ORM lookup) pairs; the lookups are fed to values_list so no
+# model instances are ever built while exporting.
+ASSIGNMENT_EXPORT_FIELDS = [
+    ("id", "id"),
+    ("status", "status"),
+    ("assigned_at", "assigned_at"),
+    ("started_at", "started_at"),
+    ("completed_at", "completed_at"),
+    ("template_id", "template_id"),
+    ("template_title", "template__title"),
+    ("student_id", "student_id"),
+    ("student_username", "student__username"),
+    ("position", "student__profile__position"),
+    ("department", "student__profile__department"),
+    ("lab_part", "student__profile__lab_part"),
+]
+
+EXPORT_COLUMNS = [name for name, _ in ASSIGNMENT_EXPORT_FIELDS]
+
+
+class Echo:
+    """File-like object that hands back whatever is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_assignment_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    if queryset is None:
+        queryset = Assignment.objects.all()
+    lookups = [lookup for _, lookup in ASSIGNMENT_EXPORT_FIELDS]
+    return queryset.order_by("pk").values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow([_cell(v) for v in row])
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        record = {name: (v.isoformat() if hasattr(v, "isoformat") else v) for name, v in zip(EXPORT_COLUMNS, row)}
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _next_block(lines):
+    return "".join(islice(lines, ASYNC_BLOCK_LINES))
+
+
+async def aiter_blocks(lines):
+    """Async version of a line iterator for ASGI responses.
+
+    Django's ASGI handler turns a sync ``streaming_content`` into a list before
+    sending it, so each block is pulled from the ORM cursor in the sync thread
+    and the export never sits in memory as a whole.
+    """
+    lines = iter(lines)
+    while block := await sync_to_async(_next_block)(lines):
+        yield block
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
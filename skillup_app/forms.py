@@ -0,0 +1,18 @@
+from django import forms
+
+from .models import Profile
+
+
+class CohortForm(forms.Form):
+    position = forms.ChoiceField(choices=[("", "Any")] + Profile.POSITIONS, required=False)
+    department = forms.ChoiceField(choices=[("", "Any")] + Profile.DEPARTMENTS, required=False)
+    lab_part = forms.ChoiceField(choices=[("", "Any")] + Profile.LAB_PARTS, required=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        if not any(cleaned.values()):
+            raise forms.ValidationError("Pick at least one cohort filter.")
+        return cleaned
+
+    def cohort(self):
+        return {k: v for k, v in self.cleaned_data.items() if v}
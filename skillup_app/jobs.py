@@ -0,0 +1,127 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+RETRY_BACKOFF_SECONDS = 30
+
+
+def job_handler(name):
+    """Register ``func(job, **payload)`` as the handler for jobs called ``name``."""
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, user=None, max_attempts=3):
+    if name not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job: {name}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        created_by=user if user and user.is_authenticated else None,
+        max_attempts=max_attempts,
+    )
+
+
+def _retry_at(attempts):
+    return timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * attempts)
+
+
+def runnable_jobs(now):
+    """Queued jobs that are due, oldest first: the worker's claim query."""
+    return Job.objects.filter(status=Job.STATUS_QUEUED, run_after__lte=now).order_by("run_after", "pk")
+
+
+def abandoned_jobs(now):
+    """RUNNING jobs whose worker lease has expired."""
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_until__lt=now)
+
+
+def requeue_abandoned():
+    """Requeue (or fail, once out of attempts) RUNNING jobs whose worker lease has expired.
+
+    A worker that is killed mid-job never records the outcome; the attempt it
+    was claimed with still counts. Returns the number of jobs recovered.
+    """
+    now = timezone.now()
+    recovered = 0
+    for pk, attempts, max_attempts in abandoned_jobs(now).values_list("pk", "attempts", "max_attempts"):
+        error = f"Worker lost: lease expired during attempt {attempts}/{max_attempts}."
+        if attempts < max_attempts:
+            changes = {"status": Job.STATUS_QUEUED, "run_after": _retry_at(attempts)}
+        else:
+            changes = {"status": Job.STATUS_FAILED, "finished_at": now}
+        # Conditional on the lease, so a worker that heartbeats meanwhile keeps its job.
+        recovered += Job.objects.filter(pk=pk, status=Job.STATUS_RUNNING, locked_until__lt=now).update(
+            locked_until=None, error=error, **changes,
+        )
+        logger.warning("Job %s: %s", pk, error)
+    return recovered
+
+
+def claim_next():
+    """Atomically move the oldest runnable job to RUNNING and return its id.
+
+    The claim is a conditional UPDATE, so several workers polling the same
+    database never pick up the same job. The claim carries a lease of
+    ``Job.LEASE_SECONDS``; abandoned jobs are requeued before claiming.
+    """
+    requeue_abandoned()
+    now = timezone.now()
+    candidates = runnable_jobs(now).values_list("pk", flat=True)[:10]
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, started_at=now, attempts=F("attempts") + 1,
+            locked_until=Job.lease_expiry(),
+        )
+        if claimed:
+            return pk
+    return None
+
+
+def run_job(pk):
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=pk)
+        handler = JOB_HANDLERS.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for {job.name!r}")
+            result = handler(job, **job.payload)
+        except Exception:
+            job.error = traceback.format_exc()
+            if job.attempts < job.max_attempts:
+                job.status = Job.STATUS_QUEUED
+                job.run_after = _retry_at(job.attempts)
+            else:
+                job.status = Job.STATUS_FAILED
+                job.finished_at = timezone.now()
+            logger.exception("Job %s failed (attempt %s/%s)", job.pk, job.attempts, job.max_attempts)
+        else:
+            job.status = Job.STATUS_DONE
+            job.result = result
+            job.progress = 100
+            job.error = ""
+            job.finished_at = timezone.now()
+        # Only record the outcome while this attempt still owns the job; if the lease
+        # expired and the job was requeued, the newer attempt decides.
+        owned = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, attempts=job.attempts).update(
+            status=job.status, result=job.result, progress=job.progress, error=job.error,
+            run_after=job.run_after, finished_at=job.finished_at, locked_until=None,
+        )
+        if not owned:
+            logger.warning("Job %s: attempt %s finished after losing its lease; outcome dropped", job.pk, job.attempts)
+        return job.status
+    finally:
+        close_old_connections()
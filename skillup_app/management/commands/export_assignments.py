@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from skillup_app.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_assignment_rows
+
+
+class Command(BaseCommand):
+    help = "Export all assignments joined with student profiles as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", "-o", help="Target file (defaults to stdout).")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        writer, _ = EXPORT_FORMATS[options["format"]]
+        rows = iter_assignment_rows(chunk_size=options["chunk_size"])
+        out = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else sys.stdout
+        try:
+            for chunk in writer(rows):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
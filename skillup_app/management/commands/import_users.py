@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from skillup_app.onboarding import IMPORT_BATCH_SIZE, import_users, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Register users from a CSV file with username,password,position[,department,lab_part] columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count).")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        with open(options["csv_path"], encoding="utf-8-sig", newline="") as fh:
+            rows, errors = parse_rows(fh.read())
+        for error in errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if errors:
+            raise CommandError(f"{len(errors)} invalid rows; nothing imported.")
+        result = import_users(rows, workers=options["workers"], batch_size=options["batch_size"])
+        for username in result["skipped"]:
+            self.stdout.write(f"skipped existing user {username}")
+        self.stdout.write(self.style.SUCCESS(f"Created {result['created']} users."))
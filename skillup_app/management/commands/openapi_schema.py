@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.openapi import SCHEMA_PATH, generate_schema
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema artifact, or with --check fail if it is out of date."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Exit non-zero if the stored schema differs from the code.")
+
+    def handle(self, *args, **options):
+        schema = generate_schema()
+        if options["check"]:
+            if not SCHEMA_PATH.exists() or SCHEMA_PATH.read_bytes() != schema:
+                raise CommandError(f"{SCHEMA_PATH} is out of date; run `manage.py openapi_schema`.")
+            self.stdout.write("OpenAPI schema is up to date.")
+            return
+        SCHEMA_PATH.parent.mkdir(parents=True, exist_ok=True)
+        SCHEMA_PATH.write_bytes(schema)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {SCHEMA_PATH}"))
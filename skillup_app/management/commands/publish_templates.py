@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from skillup_app.models import TaskTemplate
+from skillup_app.publishing import bundle_is_stale, publish_template
+
+
+class Command(BaseCommand):
+    help = "Publish static HTML bundles for active task templates and remove those of inactive ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Republish bundles that are already current.")
+
+    def handle(self, *args, **options):
+        published = removed = 0
+        for template in TaskTemplate.objects.select_related("modified").iterator():
+            if not options["force"] and not bundle_is_stale(template):
+                continue
+            if publish_template(template):
+                published += 1
+            else:
+                removed += 1
+        self.stdout.write(f"published {published} bundle(s), removed {removed}")
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from skillup_app.jobs import claim_next, run_job
+
+
+def _init_process():
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Number of jobs to run concurrently.")
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is drained.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        if options["pool"] == "process":
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        running = {}
+        self.stdout.write(f"Job worker started ({workers} {options['pool']} workers).")
+        try:
+            while True:
+                while len(running) < workers:
+                    pk = claim_next()
+                    if pk is None:
+                        break
+                    running[executor.submit(run_job, pk)] = pk
+
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                done, _ = wait(running, timeout=options["poll_interval"], return_when=FIRST_COMPLETED)
+                for future in done:
+                    pk = running.pop(future)
+                    try:
+                        self.stdout.write(f"Job {pk}: {future.result()}")
+                    except Exception as exc:
+                        self.stderr.write(f"Job {pk}: worker crashed: {exc}")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping job worker.")
+        finally:
+            executor.shutdown(wait=True)
@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: boot the WSGI app, serve one authenticated request,
+# report timings. The access token is minted between boot and the request and
+# that time is left out, so the numbers match a worker's real first request.
+PROBE = r"""
+import json, os, resource, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+from django.core.wsgi import get_wsgi_application
+from wsgiref.util import setup_testing_defaults
+application = get_wsgi_application()
+booted = time.perf_counter()
+
+from django.contrib.auth.models import User
+from skillup_app.models import ModifiedMarkdownFile, TaskTemplate
+from skillup_app.serializers import ClaimsTokenObtainPairSerializer
+user = User.objects.filter(is_active=True).order_by("-is_staff", "pk").first()
+ids = {
+    "document": ModifiedMarkdownFile.objects.values_list("pk", flat=True).first(),
+    "template": TaskTemplate.objects.values_list("pk", flat=True).first(),
+}
+if user is None or None in ids.values():
+    sys.exit("The probe needs at least one active user, document and template in the database.")
+token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+path = sys.argv[1].format(**ids)
+minted = time.perf_counter()
+
+environ = {"PATH_INFO": path, "REQUEST_METHOD": "GET", "HTTP_AUTHORIZATION": f"Bearer {token}"}
+setup_testing_defaults(environ)
+status = []
+body = b"".join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+done = time.perf_counter()
+print(json.dumps({
+    "path": path,
+    "boot_ms": (booted - start) * 1000,
+    "first_request_ms": (booted - start + done - minted) * 1000,
+    "status": status[0],
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "lazy_modules_loaded": sorted(m for m in ("drf_yasg.views", "drf_yasg.generators", "markdown.extensions.codehilite") if m in sys.modules),
+}))
+"""
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+class Command(BaseCommand):
+    help = "Measure import time, time to first request and memory of a fresh worker process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--path", default="/modified-md/{document}/render/",
+            help="URL requested as the first request; {document} and {template} are replaced with existing ids.",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Show the N slowest top-level imports.")
+
+    def run_probe(self):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, self.path],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings")},
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        top_level = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match and not match.group(3):
+                top_level[match.group(4)] = int(match.group(2)) / 1000
+        sample["import_ms"] = sum(top_level.values())
+        return sample, top_level
+
+    def handle(self, *args, **options):
+        self.path = options["path"]
+        samples, imports = [], {}
+        for _ in range(max(1, options["runs"])):
+            sample, top_level = self.run_probe()
+            samples.append(sample)
+            for name, ms in top_level.items():
+                imports.setdefault(name, []).append(ms)
+
+        def median(key):
+            return statistics.median(s[key] for s in samples)
+
+        self.stdout.write(f"runs: {len(samples)}  first request: GET {samples[0]['path']} -> {samples[0]['status']}")
+        self.stdout.write(f"import time (-X importtime):  {median('import_ms'):8.1f} ms")
+        self.stdout.write(f"application boot:             {median('boot_ms'):8.1f} ms")
+        self.stdout.write(f"time to first response:       {median('first_request_ms'):8.1f} ms")
+        self.stdout.write(f"max resident memory:          {median('max_rss_mb'):8.1f} MB")
+        self.stdout.write(f"lazy subsystems loaded:       {', '.join(samples[0]['lazy_modules_loaded']) or 'none'}")
+        self.stdout.write("slowest top-level imports (median cumulative ms):")
+        slowest = sorted(((statistics.median(v), k) for k, v in imports.items()), reverse=True)[:options["top"]]
+        for ms, name in slowest:
+            self.stdout.write(f"  {ms:8.1f}  {name}")
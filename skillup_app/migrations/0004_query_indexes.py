@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillup_app', '0003_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['-assigned_at'], name='assignment_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['student', '-assigned_at'], name='assignment_student_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['status', '-assigned_at'], name='assignment_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['-created_at'], name='job_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['created_by', '-created_at'], name='job_owner_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'QUEUED')), fields=['run_after', 'id'], name='job_queued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modifiedmarkdownfile',
+            index=models.Index(fields=['-created_at'], name='modified_md_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['department', 'lab_part'], name='profile_cohort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktemplate',
+            index=models.Index(fields=['-created_at'], name='template_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktemplate',
+            index=models.Index(fields=['is_active', '-created_at'], name='template_active_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedmarkdownfile',
+            index=models.Index(fields=['-uploaded_at'], name='uploaded_md_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:51
+
+import hashlib
+import html
+import re
+
+from django.db import migrations, models
+
+# A frozen copy of skillup_app.outline as of this migration, so later changes to
+# the app code cannot change what the backfill produces.
+ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+SETEXT_UNDERLINE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+
+def _scan_headings(content):
+    offset = 0
+    fence = None
+    previous = None
+    for line in content.splitlines(keepends=True):
+        stripped = line.rstrip("\r\n")
+        size = len(line.encode("utf-8"))
+        match = FENCE.match(stripped)
+        if fence:
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                fence = None
+        elif match:
+            fence = match.group(1)
+            previous = None
+        elif not stripped.startswith(("    ", "\t")) and ATX_HEADING.match(stripped):
+            heading = ATX_HEADING.match(stripped)
+            yield len(heading.group(1)), (heading.group(2) or "").strip(), offset
+            previous = None
+        elif previous and SETEXT_UNDERLINE.match(stripped):
+            yield (1 if stripped.strip()[0] == "=" else 2), previous[0], previous[1]
+            previous = None
+        elif stripped.strip() and not stripped.startswith(("    ", "\t")):
+            previous = previous or (stripped.strip(), offset)
+        else:
+            previous = None
+        offset += size
+
+
+def _flatten(tokens):
+    for token in tokens:
+        yield token
+        yield from _flatten(token["children"])
+
+
+def build_outline(content):
+    import markdown as md
+    from markdown.extensions.toc import slugify, unique
+
+    content = content or ""
+    renderer = md.Markdown(extensions=["extra", "sane_lists", "toc"])
+    renderer.convert(content)
+    tokens = list(_flatten(renderer.toc_tokens))
+    headings = list(_scan_headings(content))
+
+    outline = []
+    used = set()
+    for index, (level, title, start) in enumerate(headings):
+        if len(tokens) == len(headings):
+            token = tokens[index]
+            anchor, level, title = token["id"], token["level"], html.unescape(token["name"])
+        else:
+            anchor = unique(slugify(title, "-"), used)
+        used.add(anchor)
+        outline.append({"anchor": anchor, "level": level, "title": title, "start": start})
+
+    total = len(content.encode("utf-8"))
+    for index, entry in enumerate(outline):
+        entry["end"] = next(
+            (later["start"] for later in outline[index + 1:] if later["level"] <= entry["level"]),
+            total,
+        )
+    return outline
+
+
+def index_existing_files(apps, schema_editor):
+    ModifiedMarkdownFile = apps.get_model("skillup_app", "ModifiedMarkdownFile")
+    for obj in ModifiedMarkdownFile.objects.only("id", "content").iterator():
+        obj.content_hash = hashlib.sha256((obj.content or "").encode("utf-8")).hexdigest()
+        obj.outline = build_outline(obj.content)
+        obj.save(update_fields=["content_hash", "outline"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillup_app', '0004_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modifiedmarkdownfile',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the content; identifies the revision.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='modifiedmarkdownfile',
+            name='outline',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Heading anchors, levels and byte ranges of the content.'),
+        ),
+        migrations.RunPython(index_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillup_app', '0005_modified_outline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasktemplate',
+            name='bundle_path',
+            field=models.CharField(blank=True, editable=False, help_text='Published HTML bundle, relative to MEDIA_ROOT.', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='tasktemplate',
+            name='bundle_revision',
+            field=models.CharField(blank=True, editable=False, help_text='Content hash of the document the bundle was rendered from.', max_length=64),
+        ),
+    ]
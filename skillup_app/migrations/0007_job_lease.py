@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillup_app', '0006_template_bundle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='Lease of the worker running the job; once it passes, the job is treated as abandoned.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'RUNNING')), fields=['locked_until'], name='job_running_lease_idx'),
+        ),
+    ]
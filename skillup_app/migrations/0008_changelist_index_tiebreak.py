@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillup_app', '0007_job_lease'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='assignment',
+            name='assignment_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='assignment',
+            name='assignment_status_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='modifiedmarkdownfile',
+            name='modified_md_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tasktemplate',
+            name='template_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tasktemplate',
+            name='template_active_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='uploadedmarkdownfile',
+            name='uploaded_md_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['-assigned_at', '-id'], name='assignment_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['status', '-assigned_at', '-id'], name='assignment_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['-created_at', '-id'], name='job_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modifiedmarkdownfile',
+            index=models.Index(fields=['-created_at', '-id'], name='modified_md_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktemplate',
+            index=models.Index(fields=['-created_at', '-id'], name='template_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktemplate',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='template_active_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedmarkdownfile',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='uploaded_md_recent_idx'),
+        ),
+    ]
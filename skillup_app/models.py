@@ -3,7 +3,11 @@ from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
 from django.core.files.base import ContentFile
+import hashlib
 import os
+from datetime import timedelta
+
+from .outline import build_outline
 
 
 class Profile(models.Model):
@@ -49,6 +53,11 @@ class Profile(models.Model):
     department = models.CharField(max_length=8, choices=DEPARTMENTS, null=True, blank=True)
     lab_part = models.CharField(max_length=8, choices=LAB_PARTS, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["department", "lab_part"], name="profile_cohort_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} · {self.get_position_display()}"
 
@@ -74,6 +83,9 @@ class UploadedMarkdownFile(models.Model):
 
     class Meta:
         ordering = ["-uploaded_at"]
+        indexes = [
+            models.Index(fields=["-uploaded_at", "-id"], name="uploaded_md_recent_idx"),
+        ]
 
     def __str__(self):
         return self.title or os.path.basename(self.file.name)
@@ -95,14 +107,33 @@ class ModifiedMarkdownFile(models.Model):
     file = models.FileField(upload_to=upload_to_modified, blank=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False,
+                                    help_text="SHA-256 of the content; identifies the revision.")
+    outline = models.JSONField(default=list, blank=True, editable=False,
+                               help_text="Heading anchors, levels and byte ranges of the content.")
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="modified_md_recent_idx"),
+        ]
 
     def __str__(self):
         return self.title or f"Modified from {self.original}"
 
+    def refresh_outline(self):
+        """Recompute the outline if the content changed since it was last indexed."""
+        digest = hashlib.sha256((self.content or "").encode("utf-8")).hexdigest()
+        if digest == self.content_hash:
+            return False
+        self.content_hash = digest
+        self.outline = build_outline(self.content)
+        return True
+
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if (update_fields is None or "content" in update_fields) and self.refresh_outline() and update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "content_hash", "outline"}
         creating = self._state.adding
         super().save(*args, **kwargs)
         if creating or not self.file:
@@ -119,9 +150,17 @@ class TaskTemplate(models.Model):
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    bundle_path = models.CharField(max_length=255, blank=True, editable=False,
+                                   help_text="Published HTML bundle, relative to MEDIA_ROOT.")
+    bundle_revision = models.CharField(max_length=64, blank=True, editable=False,
+                                       help_text="Content hash of the document the bundle was rendered from.")
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="template_recent_idx"),
+            models.Index(fields=["is_active", "-created_at", "-id"], name="template_active_recent_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -147,6 +186,11 @@ class Assignment(models.Model):
     class Meta:
         unique_together = ("template", "student")
         ordering = ["-assigned_at"]
+        indexes = [
+            models.Index(fields=["-assigned_at", "-id"], name="assignment_recent_idx"),
+            models.Index(fields=["student", "-assigned_at"], name="assignment_student_recent_idx"),
+            models.Index(fields=["status", "-assigned_at", "-id"], name="assignment_status_recent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.template.title} → {self.student.username} [{self.status}]"
@@ -161,4 +205,60 @@ class Assignment(models.Model):
         if self.status in (self.STATUS_ASSIGNED, self.STATUS_IN_PROGRESS):
             self.status = self.STATUS_DONE
             self.completed_at = timezone.now()
-            self.save(update_fields=["status", "completed_at"])
\ No newline at end of file
+            self.save(update_fields=["status", "completed_at"])
+
+
+class Job(models.Model):
+    STATUS_QUEUED = "QUEUED"
+    STATUS_RUNNING = "RUNNING"
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+    STATUSES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=64, help_text="Registered job handler name.")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUSES, default=STATUS_QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Completion percentage.")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_until = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Lease of the worker running the job; once it passes, the job is treated as abandoned.",
+    )
+
+    # How long a claim lasts without a heartbeat; set_progress renews it.
+    LEASE_SECONDS = 300
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="job_recent_idx"),
+            models.Index(fields=["created_by", "-created_at"], name="job_owner_recent_idx"),
+            # Only queued jobs are polled, so the claim index stays small.
+            models.Index(fields=["run_after", "id"], condition=models.Q(status="QUEUED"), name="job_queued_idx"),
+            models.Index(fields=["locked_until"], condition=models.Q(status="RUNNING"), name="job_running_lease_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} [{self.status}]"
+
+    @classmethod
+    def lease_expiry(cls):
+        return timezone.now() + timedelta(seconds=cls.LEASE_SECONDS)
+
+    def set_progress(self, done, total):
+        self.progress = min(100, int(done * 100 / total)) if total else 100
+        self.locked_until = self.lease_expiry()
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, locked_until=self.locked_until)
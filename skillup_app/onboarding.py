@@ -0,0 +1,106 @@
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+
+from .models import Profile
+from .serializers import RegistrationSerializer
+
+IMPORT_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 500
+
+
+class UserImportRowSerializer(RegistrationSerializer):
+    def validate_username(self, value):
+        # Uniqueness is checked for the whole file with one set-based query.
+        return value
+
+
+def _init_hasher():
+    django.setup()
+    connections.close_all()
+
+
+def parse_rows(text):
+    """Validate CSV text with a header row; return (valid rows, errors by line)."""
+    rows, errors, seen = [], [], set()
+    reader = csv.DictReader(io.StringIO(text))
+    for line, raw in enumerate(reader, start=2):
+        data = {k.strip(): v.strip() for k, v in raw.items() if k and v and v.strip()}
+        ser = UserImportRowSerializer(data=data)
+        if not ser.is_valid():
+            errors.append({"line": line, "errors": ser.errors})
+        elif ser.validated_data["username"] in seen:
+            errors.append({"line": line, "errors": {"username": ["Duplicate username in file."]}})
+        else:
+            seen.add(ser.validated_data["username"])
+            rows.append(ser.validated_data)
+    return rows, errors
+
+
+def existing_usernames(usernames):
+    usernames = list(usernames)
+    found = set()
+    for start in range(0, len(usernames), LOOKUP_CHUNK_SIZE):
+        chunk = usernames[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(User.objects.filter(username__in=chunk).values_list("username", flat=True))
+    return found
+
+
+@contextmanager
+def password_hasher(workers=None):
+    """Yield a function that hashes a list of passwords.
+
+    ``workers=1`` hashes in the calling thread; otherwise a process pool spreads
+    the (deliberately slow) hashing over the CPUs for the duration of the block.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield lambda passwords: [make_password(password) for password in passwords]
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hasher) as pool:
+        yield lambda passwords: list(pool.map(
+            make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)),
+        ))
+
+
+def import_users(rows, workers=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Create users and profiles for validated rows, skipping usernames that already exist.
+
+    ``progress(done, total)`` is called after each committed batch.
+    """
+    taken = existing_usernames(row["username"] for row in rows)
+    rows = [row for row in rows if row["username"] not in taken]
+
+    with password_hasher(workers) as hash_passwords:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            hashes = hash_passwords([row["password"] for row in batch])
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=row["username"], password=password)
+                    for row, password in zip(batch, hashes)
+                ])
+                if any(user.pk is None for user in users):
+                    # Backends without RETURNING support don't set primary keys.
+                    ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list("username", "id"))
+                    for user in users:
+                        user.pk = ids[user.username]
+                Profile.objects.bulk_create([
+                    Profile(
+                        user=user,
+                        position=row["position"],
+                        department=row.get("department") or None,
+                        lab_part=row.get("lab_part") or None,
+                    )
+                    for user, row in zip(users, batch)
+                ])
+            if progress:
+                progress(start + len(batch), len(rows))
+    return {"created": len(rows), "skipped": sorted(taken)}
@@ -0,0 +1,100 @@
+import html
+import re
+
+from .utils import render_markdown
+
+ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+SETEXT_UNDERLINE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+HEADING_ID = re.compile(r'(<h[1-6]\b[^>]*?\bid=")[^"]*(")')
+
+
+def _scan_headings(content):
+    """Yield (level, title, byte offset) for each ATX/setext heading outside code fences."""
+    offset = 0
+    fence = None
+    previous = None  # (text, offset) of the last plain paragraph line
+    for line in content.splitlines(keepends=True):
+        stripped = line.rstrip("\r\n")
+        size = len(line.encode("utf-8"))
+        match = FENCE.match(stripped)
+        if fence:
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                fence = None
+        elif match:
+            fence = match.group(1)
+            previous = None
+        elif not stripped.startswith(("    ", "\t")) and ATX_HEADING.match(stripped):
+            heading = ATX_HEADING.match(stripped)
+            yield len(heading.group(1)), (heading.group(2) or "").strip(), offset
+            previous = None
+        elif previous and SETEXT_UNDERLINE.match(stripped):
+            yield (1 if stripped.strip()[0] == "=" else 2), previous[0], previous[1]
+            previous = None
+        elif stripped.strip() and not stripped.startswith(("    ", "\t")):
+            previous = previous or (stripped.strip(), offset)
+        else:
+            previous = None
+        offset += size
+
+
+def _flatten(tokens):
+    for token in tokens:
+        yield token
+        yield from _flatten(token["children"])
+
+
+def build_outline(content):
+    """Return the heading outline of a Markdown document.
+
+    Each entry has the anchor the ``toc`` extension assigns in ``render_markdown``,
+    the heading level and title, and the UTF-8 byte range [start, end) of the
+    section in ``content``; a section runs until the next heading of the same or
+    a higher level.
+    """
+    import markdown as md
+    from markdown.extensions.toc import slugify, unique
+
+    content = content or ""
+    renderer = md.Markdown(extensions=["extra", "sane_lists", "toc"])
+    renderer.convert(content)
+    tokens = list(_flatten(renderer.toc_tokens))
+    headings = list(_scan_headings(content))
+
+    outline = []
+    used = set()
+    for index, (level, title, start) in enumerate(headings):
+        if len(tokens) == len(headings):
+            token = tokens[index]
+            anchor, level, title = token["id"], token["level"], html.unescape(token["name"])
+        else:
+            # Headings the scanner cannot line up with the rendered TOC get the same slug rule.
+            anchor = unique(slugify(title, "-"), used)
+        used.add(anchor)
+        outline.append({"anchor": anchor, "level": level, "title": title, "start": start})
+
+    total = len(content.encode("utf-8"))
+    for index, entry in enumerate(outline):
+        entry["end"] = next(
+            (later["start"] for later in outline[index + 1:] if later["level"] <= entry["level"]),
+            total,
+        )
+    return outline
+
+
+def section_source(content, entry):
+    return content.encode("utf-8")[entry["start"]:entry["end"]].decode("utf-8")
+
+
+def render_section(content, outline, entry):
+    """Render one section with the heading ids it has in the whole document.
+
+    Rendered on its own, a slice restarts the ``toc`` slug counter, so a second
+    "Setup" section would come back as ``id="setup"`` instead of ``setup_1``.
+    """
+    anchors = iter([e["anchor"] for e in outline if entry["start"] <= e["start"] < entry["end"]])
+
+    def restore_id(match):
+        anchor = next(anchors, None)
+        return match.group(0) if anchor is None else f"{match.group(1)}{anchor}{match.group(2)}"
+    return HEADING_ID.sub(restore_id, render_markdown(section_source(content, entry)))
@@ -0,0 +1,40 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap enough to keep.
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_row_count(model, using="default"):
+    """Return the planner's row estimate for a model's table, or None if unavailable."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+            # The first number of each stat row is the row count of that index;
+            # partial indexes report fewer rows, so take the largest.
+            counts = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+            return max(counts) if counts else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses the table statistics instead of COUNT(*) for large, unfiltered changelists."""
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if hasattr(qs, "query") and not qs.query.where:
+            estimate = estimated_row_count(qs.model, using=qs.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
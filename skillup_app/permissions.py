@@ -8,4 +8,4 @@ class IsAdmin(BasePermission):
 
 class IsAssignee(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return bool(request.user and request.user.is_athenticated and obj.student_id == request.user.id)
+        return bool(request.user and request.user.is_authenticated and obj.student_id == request.user.id)
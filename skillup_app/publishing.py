@@ -0,0 +1,72 @@
+"""Static HTML bundles for active task templates.
+
+Publishing renders a template's document once and writes it under MEDIA_ROOT at
+``published/templates/<id>/<digest>.html`` together with ``.gz`` (and ``.br``
+when the optional ``brotli`` package is installed) copies, so the front web
+server can serve it with ``gzip_static``/``brotli_static`` and far-future
+caching. The digest changes with the content, so a path never changes meaning.
+"""
+import hashlib
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .models import TaskTemplate
+from .utils import compressed_variants, render_markdown
+
+BUNDLE_ROOT = "published/templates"
+
+
+def bundle_is_stale(template):
+    if not template.is_active:
+        return bool(template.bundle_path)
+    return template.bundle_revision != template.modified.content_hash
+
+
+def bundle_url(template):
+    """URL of the template's published HTML, or None until a current bundle exists."""
+    if not template.bundle_path or bundle_is_stale(template):
+        return None
+    return default_storage.url(template.bundle_path)
+
+
+def _delete_bundle(path):
+    if not path:
+        return
+    for suffix in ("", ".gz", ".br"):
+        if default_storage.exists(path + suffix):
+            default_storage.delete(path + suffix)
+
+
+def _write_once(name, body):
+    # Names are content-addressed, so an existing file already holds these bytes.
+    if default_storage.exists(name):
+        return
+    saved = default_storage.save(name, ContentFile(body))
+    if saved != name:
+        # A concurrent publish wrote the same file first and the storage picked
+        # another name for ours; drop the duplicate instead of leaving an orphan.
+        default_storage.delete(saved)
+
+
+def publish_template(template):
+    """Write the bundle for an active template (or remove it for an inactive one); return its path."""
+    previous = template.bundle_path
+    if not template.is_active:
+        TaskTemplate.objects.filter(pk=template.pk).update(bundle_path="", bundle_revision="")
+        _delete_bundle(previous)
+        return None
+
+    modified = template.modified
+    html = render_markdown(modified.content).encode("utf-8")
+    digest = hashlib.sha256(html).hexdigest()[:20]
+    path = posixpath.join(BUNDLE_ROOT, str(template.pk), f"{digest}.html")
+    for suffix, body in [("", html), *compressed_variants(html)]:
+        _write_once(path + suffix, body)
+
+    TaskTemplate.objects.filter(pk=template.pk).update(bundle_path=path, bundle_revision=modified.content_hash)
+    template.bundle_path, template.bundle_revision = path, modified.content_hash
+    if previous and previous != path:
+        _delete_bundle(previous)
+    return path
@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from django.db import transaction
 from rest_framework import serializers
-from .models import Profile, UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Profile, UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment, Job
+from .publishing import bundle_url
 from .utils import render_markdown
 
 
@@ -33,6 +37,44 @@ class RegistrationSerializer(serializers.Serializer):
         return user
 
 
+def user_claims(user):
+    """The claims ``ClaimsJWTAuthentication`` needs to authorize reads without a user query."""
+    profile = getattr(user, "profile", None)
+    return {
+        "username": user.username,
+        "is_staff": user.is_staff,
+        "position": profile.position if profile else None,
+        "department": profile.department if profile else None,
+        "lab_part": profile.lab_part if profile else None,
+    }
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @property
+    def access_token(self):
+        # The stock refresh copies the claims frozen into the refresh token; reload
+        # them so a changed staff flag or profile reaches the next access token.
+        access = super().access_token
+        user = User.objects.select_related("profile").filter(pk=self[jwt_settings.USER_ID_CLAIM]).first()
+        if user is not None:
+            for claim, value in user_claims(user).items():
+                access[claim] = value
+        return access
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+
 class UserSerializer(serializers.ModelSerializer):
     position = serializers.CharField(source="profile.get_position_display", read_only=True)
     department = serializers.CharField(source='profile.get_department_display', read_only=True)
@@ -103,10 +145,47 @@ class AssignmentSerializer(serializers.ModelSerializer):
 class MyAssignmentSerializer(serializers.ModelSerializer):
     template_title = serializers.CharField(source="template.title", read_only=True)
     html = serializers.SerializerMethodField()
+    bundle_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Assignment
-        fields = ["id", "template", "template_title", "status", "assigned_at", "started_at", "completed_at", "html"]
+        fields = ["id", "template", "template_title", "status", "assigned_at", "started_at", "completed_at", "html", "bundle_url"]
 
     def get_html(self, obj):
-        return render_markdown(obj.template.modified.content)
\ No newline at end of file
+        # Clients load the published bundle when there is one; render inline otherwise.
+        if bundle_url(obj.template):
+            return None
+        return render_markdown(obj.template.modified.content)
+
+    def get_bundle_url(self, obj):
+        url = bundle_url(obj.template)
+        return self.context["request"].build_absolute_uri(url) if url and "request" in self.context else url
+
+
+class CohortSerializer(serializers.Serializer):
+    student_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    position = serializers.ChoiceField(choices=Profile.POSITIONS, required=False)
+    department = serializers.ChoiceField(choices=Profile.DEPARTMENTS, required=False)
+    lab_part = serializers.ChoiceField(choices=Profile.LAB_PARTS, required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Provide student_ids or at least one cohort filter.")
+        return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ["id", "name", "status", "progress", "result", "error", "attempts",
+                  "created_at", "started_at", "finished_at"]
+        read_only_fields = fields
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET"], default="GET")
+    path = serializers.RegexField(r"^/", max_length=2048)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False, max_length=20)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .authentication import forget_user_state
+from .events import publish_to_users
+from .jobs import enqueue
+from .models import Assignment, Job, ModifiedMarkdownFile, TaskTemplate
+from .publishing import bundle_is_stale
+
+ASSIGNMENT_EVENTS = {
+    Assignment.STATUS_IN_PROGRESS: "assignment.started",
+    Assignment.STATUS_DONE: "assignment.done",
+}
+
+
+def _enqueue_publish(template_id):
+    # A queued job reads the template when it runs, so one is enough per template.
+    queued = Job.objects.filter(name="publish_template", status=Job.STATUS_QUEUED, payload__template_id=template_id)
+    if not queued.exists():
+        enqueue("publish_template", {"template_id": template_id})
+
+
+def _queue_publish(template):
+    if bundle_is_stale(template):
+        transaction.on_commit(lambda: _enqueue_publish(template.id))
+
+
+def _publish_template_changed(template_id):
+    student_ids = Assignment.objects.filter(template_id=template_id).values_list("student_id", flat=True)
+    publish_to_users(student_ids, "template.updated", {"template": template_id})
+
+
+@receiver(post_save, sender=Assignment)
+def assignment_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        event_type = "assignment.created"
+    elif update_fields is None or "status" in update_fields:
+        event_type = ASSIGNMENT_EVENTS.get(instance.status)
+    else:
+        event_type = None
+    if not event_type:
+        return
+    data = {"id": instance.id, "template": instance.template_id, "status": instance.status}
+    transaction.on_commit(lambda: publish_to_users([instance.student_id], event_type, data))
+
+
+@receiver(post_save, sender=TaskTemplate)
+def template_saved(sender, instance, created, **kwargs):
+    _queue_publish(instance)
+    if not created:
+        transaction.on_commit(lambda: _publish_template_changed(instance.id))
+
+
+@receiver(post_save, sender=ModifiedMarkdownFile)
+def modified_file_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    template = TaskTemplate.objects.filter(modified=instance).first()
+    if template:
+        template.modified = instance
+        _queue_publish(template)
+        transaction.on_commit(lambda: _publish_template_changed(template.id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, **kwargs):
+    # Drop this process's cached revocation state so deactivation or a password
+    # change takes effect here immediately; other workers pick it up within the TTL.
+    forget_user_state(instance.pk)
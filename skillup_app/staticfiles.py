@@ -0,0 +1,183 @@
+"""Fingerprinted, precompressed static files.
+
+``collectstatic`` copies the assets to STATIC_ROOT, builds the SVG sprites
+listed in ``SKILLUP_SVG_SPRITES``, renames every file to include a hash of its
+content and writes ``.gz`` (and ``.br`` when brotli is installed) copies of the
+hashed text assets next to them. ``serve_static`` answers with the smallest
+variant the client accepts; a hashed name never changes content, so those
+responses are marked immutable.
+"""
+import logging
+import mimetypes
+import os
+import posixpath
+from functools import lru_cache
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from .utils import compressed_variants
+
+logger = logging.getLogger(__name__)
+
+SVG_NS = "http://www.w3.org/2000/svg"
+SPRITE_NAME = "icons-sprite.svg"
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".eot", ".ttf", ".otf"}
+# A variant is only kept when it is at least this much smaller than the original.
+MIN_SAVING = 0.05
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+UNHASHED_MAX_AGE = 60
+
+# Root attributes that describe the icon's own canvas rather than how it is drawn.
+SPRITE_SKIPPED_ATTRIBUTES = {"id", "class", "width", "height", "x", "y", "version", "viewBox"}
+
+
+def build_sprite(icons):
+    """Combine (name, svg bytes) pairs into one SVG of ``<symbol id="name">`` elements."""
+    ElementTree.register_namespace("", SVG_NS)
+    sprite = ElementTree.Element(f"{{{SVG_NS}}}svg", {"style": "display:none"})
+    for name, data in icons:
+        icon = ElementTree.fromstring(data)
+        viewbox = icon.get("viewBox") or f"0 0 {icon.get('width', '24')} {icon.get('height', '24')}".replace("px", "")
+        symbol = ElementTree.SubElement(sprite, f"{{{SVG_NS}}}symbol", {"id": name, "viewBox": viewbox})
+        for key, value in icon.attrib.items():
+            if key not in SPRITE_SKIPPED_ATTRIBUTES:
+                symbol.set(key, value)
+        symbol.extend(icon)
+    return ElementTree.tostring(sprite, encoding="utf-8", xml_declaration=False)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Without a manifest entry (collectstatic not run yet, as in tests and fresh
+    # checkouts) pages link the unhashed name, which is served with a short max-age.
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for directory in getattr(settings, "SKILLUP_SVG_SPRITES", []):
+                name = self.write_sprite(directory, paths)
+                if name:
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for hashed_name in sorted(set(self.hashed_files.values())):
+                if posixpath.splitext(hashed_name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                    self.write_compressed(hashed_name)
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                # Vendor stylesheets reference files that are not shipped; keep those URLs as they are.
+                logger.warning("%s references missing static file %s", name, matchobj["url"])
+                return matchobj["matched"]
+        return convert
+
+    def write_sprite(self, directory, paths):
+        prefix = posixpath.join(directory, "icons") + "/"
+        icons = []
+        for path in sorted(paths):
+            if path.startswith(prefix) and path.endswith(".svg") and "/" not in path[len(prefix):]:
+                storage, source = paths[path]
+                with storage.open(source) as handle:
+                    icons.append((posixpath.basename(path)[:-4], handle.read()))
+        if not icons:
+            return None
+        name = posixpath.join(directory, SPRITE_NAME)
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(build_sprite(icons)))
+        return name
+
+    def write_compressed(self, name):
+        with self.open(name) as handle:
+            body = handle.read()
+        for suffix, data in compressed_variants(body):
+            # Hashed names are content-addressed, so an existing variant is already current.
+            if len(data) <= len(body) * (1 - MIN_SAVING) and not self.exists(name + suffix):
+                self._save(name + suffix, ContentFile(data))
+
+
+@lru_cache(maxsize=None)
+def _hashed_names():
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+@lru_cache(maxsize=8192)
+def _collected_file(path):
+    """Return (filesystem path, available encoding suffixes) for a file in STATIC_ROOT, or None."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(full_path):
+        return None
+    return full_path, frozenset(suffix for _, suffix in ENCODINGS if os.path.isfile(full_path + suffix))
+
+
+def accepted_encodings(header):
+    """Map each content coding in an Accept-Encoding header to its q-value."""
+    codings = {}
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding.lower()] = quality
+    return codings
+
+
+def clear_caches():
+    _hashed_names.cache_clear()
+    _collected_file.cache_clear()
+
+
+@require_safe
+def serve_static(request, path):
+    found = _collected_file(path)
+    if found is None:
+        raise Http404(f"{path} is not a collected static file.")
+    full_path, suffixes = found
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    encoding, suffix = next(
+        ((encoding, suffix) for encoding, suffix in ENCODINGS
+         if suffix in suffixes and accepted.get(encoding, accepted.get("*", 0)) > 0),
+        (None, ""),
+    )
+    content_type, _ = mimetypes.guess_type(full_path)
+    response = FileResponse(open(full_path + suffix, "rb"), content_type=content_type or "application/octet-stream")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    if suffixes:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    if path in _hashed_names():
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=UNHASHED_MAX_AGE)
+    return response
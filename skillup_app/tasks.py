@@ -0,0 +1,87 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import storages
+from django.db import transaction
+
+from .events import publish_to_users
+from .jobs import job_handler
+from .models import Assignment, TaskTemplate
+from .onboarding import import_users, parse_rows
+from .publishing import publish_template
+
+ASSIGN_BATCH_SIZE = 500
+# Small batches so progress (and the job lease) is renewed while passwords hash.
+IMPORT_JOB_BATCH_SIZE = 50
+DEFAULT_IMPORT_WORKERS = 2
+
+
+def cohort_queryset(student_ids=None, position=None, department=None, lab_part=None):
+    qs = User.objects.filter(is_active=True)
+    if student_ids:
+        qs = qs.filter(pk__in=student_ids)
+    if position:
+        qs = qs.filter(profile__position=position)
+    if department:
+        qs = qs.filter(profile__department=department)
+    if lab_part:
+        qs = qs.filter(profile__lab_part=lab_part)
+    return qs
+
+
+def _publish_created(template_id, rows):
+    # bulk_create skips post_save, so the assignment.created events are sent here.
+    for pk, student_id, status in rows:
+        publish_to_users([student_id], "assignment.created", {"id": pk, "template": template_id, "status": status})
+
+
+@job_handler("assign_template")
+def assign_template(job, template_id, **cohort):
+    """Assign a template to every student in the cohort, skipping existing assignments."""
+    template = TaskTemplate.objects.get(pk=template_id)
+    student_ids = list(cohort_queryset(**cohort).values_list("pk", flat=True))
+    total = len(student_ids)
+    for start in range(0, total, ASSIGN_BATCH_SIZE):
+        batch = student_ids[start:start + ASSIGN_BATCH_SIZE]
+        with transaction.atomic():
+            assigned = Assignment.objects.filter(template=template, student_id__in=batch)
+            existing = set(assigned.values_list("student_id", flat=True))
+            new_ids = [pk for pk in batch if pk not in existing]
+            Assignment.objects.bulk_create(
+                [Assignment(template=template, student_id=pk) for pk in new_ids],
+                ignore_conflicts=True,
+            )
+            rows = list(assigned.filter(student_id__in=new_ids).values_list("id", "student_id", "status"))
+            transaction.on_commit(partial(_publish_created, template.pk, rows))
+        job.set_progress(start + len(batch), total)
+    return {"template": template.pk, "students": total}
+
+
+@job_handler("publish_template")
+def publish_template_job(job, template_id):
+    template = TaskTemplate.objects.select_related("modified").filter(pk=template_id).first()
+    if template is None:
+        return {"template": template_id, "bundle": None}
+    return {"template": template_id, "bundle": publish_template(template)}
+
+
+@job_handler("import_users")
+def import_users_job(job, upload):
+    """Register the users in an uploaded CSV kept in the private storage."""
+    storage = storages["private"]
+    try:
+        with storage.open(upload) as fh:
+            rows, errors = parse_rows(fh.read().decode("utf-8-sig"))
+        if errors:
+            raise ValueError(f"{len(errors)} invalid rows in {upload}")
+        # A small pool keeps the worker host responsive to other jobs; users
+        # created by an interrupted earlier attempt are skipped as existing.
+        workers = getattr(settings, "SKILLUP_IMPORT_WORKERS", DEFAULT_IMPORT_WORKERS)
+        result = import_users(rows, workers=workers, batch_size=IMPORT_JOB_BATCH_SIZE, progress=job.set_progress)
+    except Exception:
+        if job.attempts >= job.max_attempts:
+            storage.delete(upload)
+        raise
+    storage.delete(upload)
+    return result
@@ -1,3 +1,928 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import posixpath
+import json
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage, storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.db.models import F
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import ResolverMatch
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from django.utils import timezone
+
+from core.openapi import SCHEMA_PATH, generate_schema
+
+from .models import Profile, UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment, Job
+from .authentication import _user_state, _user_state_cache
+from .db_router import REPLICA_ALIAS, ReplicaRouter, replica_reads
+from .exports import EXPORT_COLUMNS
+from .onboarding import import_users, parse_rows
+from .outline import build_outline, section_source
+from .paginators import EstimatedCountPaginator
+from .serializers import ClaimsTokenObtainPairSerializer, MyAssignmentSerializer
+from .views import (AssignmentViewSet, JobViewSet, ModifiedMarkdownFileViewSet, TaskTemplateViewSet,
+                    UploadedMarkdownFileViewSet)
+from .publishing import bundle_url, publish_template
+from .utils import brotli
+from .staticfiles import clear_caches
+from .jobs import (JOB_HANDLERS, RETRY_BACKOFF_SECONDS, abandoned_jobs, claim_next, enqueue, job_handler, run_job,
+                   runnable_jobs)
+from .tasks import cohort_queryset
+
+
+# Plan lines that mean the database reads a whole table or sorts in a temp structure.
+BAD_PLAN_PATTERNS = {
+    "sqlite": [re.compile(r"\bSCAN \w+$", re.M), re.compile(r"USE TEMP B-TREE")],
+    "postgresql": [re.compile(r"Seq Scan"), re.compile(r"^\s*(->\s*)?Sort\b", re.M)],
+}
+
+
+class MediaTestCase(TestCase):
+    """Saves files (ModifiedMarkdownFile, bundles) to a MEDIA_ROOT removed after the class."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix="skillup-media-")
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+
+def create_template(content="# Lab", title="t", **fields):
+    """A task template over a freshly uploaded and modified Markdown file."""
+    original = UploadedMarkdownFile.objects.create(title="u", file="md/originals/u.md")
+    modified = ModifiedMarkdownFile.objects.create(original=original, title="m", content=content)
+    return TaskTemplate.objects.create(modified=modified, title=title, **fields)
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the main query behind each endpoint against a seeded database."""
+
+    STUDENTS = 200
+    TEMPLATES = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([User(username=f"student{i}") for i in range(cls.STUDENTS)])
+        Profile.objects.bulk_create([
+            Profile(user=user, position=Profile.POSITION_SWE,
+                    department=Profile.DEPARTMENTS[i % 4][0], lab_part=Profile.LAB_PARTS[i % 5][0])
+            for i, user in enumerate(users)
+        ])
+        originals = UploadedMarkdownFile.objects.bulk_create([
+            UploadedMarkdownFile(title=f"u{i}", file=f"md/originals/u{i}.md") for i in range(cls.TEMPLATES)
+        ])
+        modified = ModifiedMarkdownFile.objects.bulk_create([
+            ModifiedMarkdownFile(original=original, title=f"m{i}", content="# Seed", file=f"md/modified/m{i}.md")
+            for i, original in enumerate(originals)
+        ])
+        templates = TaskTemplate.objects.bulk_create([
+            TaskTemplate(modified=m, title=f"t{i}", is_active=i % 3 != 0) for i, m in enumerate(modified)
+        ])
+        statuses = [s for s, _ in Assignment.STATUSES]
+        Assignment.objects.bulk_create([
+            Assignment(template=t, student=u, status=statuses[(i + j) % 3])
+            for i, t in enumerate(templates) for j, u in enumerate(users)
+        ])
+        Job.objects.bulk_create([
+            Job(name="assign_template", created_by=users[i % 10],
+                status=Job.STATUS_DONE if i % 4 else Job.STATUS_QUEUED)
+            for i in range(500)
+        ])
+        cls.student = users[0]
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertIndexedPlan(self, queryset):
+        patterns = BAD_PLAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            self.skipTest(f"No plan rules for {connection.vendor}")
+        plan = queryset.explain()
+        for pattern in patterns:
+            self.assertIsNone(pattern.search(plan), f"{pattern.pattern!r} in plan:\n{plan}\nfor {queryset.query}")
+
+    def viewset_queryset(self, viewset, action):
+        """The queryset ``viewset`` lists for ``action`` when the seeded student calls it."""
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, self.student)
+        view = viewset(action_map={"get": action}, kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(request)
+        return view.filter_queryset(view.get_queryset())
+
+    def changelist_queryset(self, model, **params):
+        """The queryset the admin changelist of ``model`` shows for the given filter parameters."""
+        request = RequestFactory().get("/", params)
+        request.user = self.admin
+        return admin.site._registry[model].get_changelist_instance(request).get_queryset(request)
+
+    def test_my_assignments(self):
+        self.assertIndexedPlan(self.viewset_queryset(AssignmentViewSet, "my_assignments"))
+
+    def test_assignment_list(self):
+        self.assertIndexedPlan(self.viewset_queryset(AssignmentViewSet, "list"))
+
+    def test_assignment_status_filter(self):
+        self.assertIndexedPlan(self.changelist_queryset(Assignment, status__exact=Assignment.STATUS_DONE))
+
+    def test_template_list(self):
+        self.assertIndexedPlan(self.viewset_queryset(TaskTemplateViewSet, "list"))
+
+    def test_active_templates(self):
+        self.assertIndexedPlan(self.changelist_queryset(TaskTemplate, is_active__exact="1"))
+
+    def test_modified_md_list(self):
+        self.assertIndexedPlan(self.viewset_queryset(ModifiedMarkdownFileViewSet, "list"))
+
+    def test_uploaded_md_list(self):
+        self.assertIndexedPlan(self.viewset_queryset(UploadedMarkdownFileViewSet, "list"))
+
+    def test_admin_changelists(self):
+        for model in [UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment, Job]:
+            with self.subTest(model=model.__name__):
+                self.assertIndexedPlan(self.changelist_queryset(model))
+
+    def test_profile_cohort(self):
+        self.assertIndexedPlan(self.changelist_queryset(
+            Profile, department__exact=Profile.DEPT_CST, lab_part__exact=Profile.LAB_C02,
+        ))
+
+    def test_cohort_students(self):
+        self.assertIndexedPlan(cohort_queryset(department=Profile.DEPT_CST, lab_part=Profile.LAB_C02))
+
+    def test_user_jobs(self):
+        self.assertIndexedPlan(self.viewset_queryset(JobViewSet, "list"))
+
+    def test_job_claim(self):
+        self.assertIndexedPlan(runnable_jobs(timezone.now()))
+
+    def test_job_lease_sweep(self):
+        self.assertIndexedPlan(abandoned_jobs(timezone.now()))
+
+
+class DatabaseProfileTests(TestCase):
+    def test_reads_use_default_outside_replica_block(self):
+        self.assertIsNone(ReplicaRouter().db_for_read(Assignment))
+
+    def test_replica_reads_without_replica_configured(self):
+        with replica_reads() as alias:
+            self.assertIsNone(alias)
+
+    def test_sqlite_pragmas_applied(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class ReplicaRoutingTests(MediaTestCase):
+    """Route API requests between two SQLite databases, as SKILLUP_DB_REPLICA_NAME would."""
+
+    # The replica alias is added in setUpClass, after the runner has collected aliases.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp(prefix="skillup-replica-")
+        connections.settings[REPLICA_ALIAS] = {
+            **connections["default"].settings_dict,
+            "NAME": str(Path(cls.replica_dir) / "replica.sqlite3"),
+        }
+        call_command("migrate", database=REPLICA_ALIAS, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.settings[REPLICA_ALIAS]
+        shutil.rmtree(cls.replica_dir)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(username="student")
+        template = create_template()
+        cls.assignment = Assignment.objects.create(template=template, student=cls.student)
+
+    def setUp(self):
+        _user_state_cache.clear()
+        token = ClaimsTokenObtainPairSerializer.get_token(self.student).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    def request(self, method, path):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = getattr(self.client, method)(path)
+        return response, [q["sql"] for q in primary.captured_queries], [q["sql"] for q in replica.captured_queries]
+
+    def test_reads_go_to_replica_and_token_checks_to_primary(self):
+        response, primary, replica = self.request("get", "/assignments/my/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])  # nothing was replicated into the second file
+        self.assertTrue(replica)
+        self.assertTrue(all('"skillup_app_assignment"' in sql for sql in replica))
+        # The only primary query is the revocation check of the token's user.
+        self.assertEqual(len(primary), 1)
+        self.assertIn('"auth_user"', primary[0])
+
+    def test_writes_go_to_primary(self):
+        response, primary, replica = self.request("post", f"/assignments/{self.assignment.pk}/start/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
+        self.assertEqual(ReplicaRouter().db_for_write(Assignment), "default")
+
+    def test_export_body_is_read_from_replica(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        token = ClaimsTokenObtainPairSerializer.get_token(admin).access_token
+        response = self.client.get("/assignments/export/csv/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            body = b"".join(response.streaming_content).decode()
+        self.assertEqual(body.splitlines(), [",".join(EXPORT_COLUMNS)])
+        self.assertEqual(primary.captured_queries, [])
+        self.assertEqual(len(replica.captured_queries), 1)
+
+
+class OpenAPISchemaTests(TestCase):
+    def test_stored_schema_matches_code(self):
+        self.assertTrue(SCHEMA_PATH.exists(), f"{SCHEMA_PATH} is missing; run `manage.py openapi_schema`.")
+        self.assertEqual(SCHEMA_PATH.read_bytes(), generate_schema(),
+                         f"{SCHEMA_PATH} is out of date; run `manage.py openapi_schema`.")
+
+    def test_schema_served_with_etag(self):
+        response = self.client.get("/swagger.json")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/swagger.json", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_swagger_ui_never_generates_schema(self):
+        from drf_yasg.generators import OpenAPISchemaGenerator
+
+        with mock.patch.object(OpenAPISchemaGenerator, "get_schema") as get_schema:
+            for _ in range(3):
+                response = self.client.get("/swagger/")
+                self.assertEqual(response.status_code, 200)
+        get_schema.assert_not_called()
+        self.assertContains(response, '"url": "/swagger.json"')
+
+
+class OutlineTests(TestCase):
+    CONTENT = "# Lab\n\nIntro ü\n\n```\n# not a heading\n```\n\n## Setup\n\nsteps\n\nRun\n---\n\ngo\n"
+
+    def test_outline_matches_rendered_anchors(self):
+        outline = build_outline(self.CONTENT)
+        self.assertEqual([(e["anchor"], e["level"]) for e in outline], [("lab", 1), ("setup", 2), ("run", 2)])
+
+    def test_sections_use_byte_offsets(self):
+        outline = build_outline(self.CONTENT)
+        self.assertEqual(section_source(self.CONTENT, outline[1]), "## Setup\n\nsteps\n\n")
+        self.assertEqual(outline[0]["end"], len(self.CONTENT.encode("utf-8")))
+
+
+class SectionEndpointTests(MediaTestCase):
+    CONTENT = "# Lab\n\n## Setup\n\nfirst\n\n## Setup\n\nsecond\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(username="student")
+        cls.template = create_template(cls.CONTENT)
+        cls.modified = cls.template.modified
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def section(self, anchor):
+        return self.client.get(f"/templates/{self.template.id}/sections/{anchor}/")
+
+    def test_section_keeps_document_heading_ids(self):
+        response = self.section("setup_1")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('<h2 id="setup_1">', response.data["html"])
+        self.assertIn("second", response.data["html"])
+        self.assertNotIn('id="setup"', response.data["html"])
+
+    def test_unknown_anchor_is_404(self):
+        self.assertEqual(self.section("nope").status_code, 404)
+
+    def test_cache_is_keyed_by_revision(self):
+        before = self.section("setup").data
+        self.assertIsNotNone(cache.get(f"skillup:section:{self.modified.pk}:{before['revision']}:setup"))
+        self.modified.content = self.CONTENT.replace("first", "edited")
+        self.modified.save()
+        after = self.section("setup").data
+        self.assertNotEqual(after["revision"], before["revision"])
+        self.assertIn("edited", after["html"])
+
+    def test_cache_hit_skips_loading_content(self):
+        content_column = f'"{ModifiedMarkdownFile._meta.db_table}"."content"'
+        with CaptureQueriesContext(connection) as miss:
+            self.section("setup")
+        self.assertTrue(any(content_column in q["sql"] for q in miss.captured_queries))
+        with CaptureQueriesContext(connection) as hit:
+            self.assertEqual(self.section("setup").status_code, 200)
+        self.assertFalse(any(content_column in q["sql"] for q in hit.captured_queries))
+
+
+class PublishingTests(MediaTestCase):
+    def setUp(self):
+        self.student = User.objects.create(username="student")
+        self.template = create_template("# Lab\n\nsteps\n")
+        self.modified = self.template.modified
+        self.assignment = Assignment.objects.create(template=self.template, student=self.student)
+
+    def test_publish_writes_compressed_bundle(self):
+        path = publish_template(self.template)
+        with default_storage.open(path) as html, default_storage.open(path + ".gz") as gz:
+            self.assertEqual(gzip.decompress(gz.read()), html.read())
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.bundle_revision, self.modified.content_hash)
+        data = MyAssignmentSerializer(Assignment.objects.select_related("template__modified").get()).data
+        self.assertIsNone(data["html"])
+        self.assertEqual(data["bundle_url"], default_storage.url(path))
+
+    def test_edit_invalidates_and_replaces_bundle(self):
+        old = publish_template(self.template)
+        self.modified.content = "# Lab\n\nnew steps\n"
+        self.modified.save()
+        self.template.refresh_from_db()
+        self.assertIsNone(bundle_url(self.template))
+        new = publish_template(self.template)
+        self.assertNotEqual(old, new)
+        self.assertFalse(default_storage.exists(old))
+
+    def test_concurrent_publish_leaves_no_duplicate_files(self):
+        path = publish_template(self.template)
+        real_exists, checked = default_storage.exists, set()
+
+        def exists(name):
+            # The first check for each file races with the other job's write.
+            if name in checked:
+                return real_exists(name)
+            checked.add(name)
+            return False
+        with mock.patch.object(default_storage, "exists", side_effect=exists):
+            self.assertEqual(publish_template(self.template), path)
+        directory = posixpath.dirname(path)
+        self.assertEqual(sorted(default_storage.listdir(directory)[1]),
+                         sorted(posixpath.basename(path) + suffix for suffix in ("", ".gz", *([".br"] if brotli else []))))
+
+    def test_saves_queue_one_publish_job(self):
+        for content in ("# Lab\n\nv2\n", "# Lab\n\nv3\n"):
+            self.modified.content = content
+            with self.captureOnCommitCallbacks(execute=True):
+                self.modified.save()
+        self.assertEqual(Job.objects.filter(name="publish_template", status=Job.STATUS_QUEUED).count(), 1)
+
+    def test_inactive_template_is_unpublished(self):
+        path = publish_template(self.template)
+        self.template.is_active = False
+        self.assertIsNone(publish_template(self.template))
+        self.assertFalse(default_storage.exists(path + ".gz"))
+
+
+class StaticPipelineTests(TestCase):
+    ICON = '<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" fill="none"><path d="M0 0h{}v24z"/></svg>'
+
+    def setUp(self):
+        source = Path(tempfile.mkdtemp(prefix="skillup-static-src-"))
+        static_root = tempfile.mkdtemp(prefix="skillup-static-")
+        for directory in (source, static_root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        (source / "kit" / "icons").mkdir(parents=True)
+        for name in ("home", "print"):
+            (source / "kit" / "icons" / f"{name}.svg").write_text(self.ICON.format(len(name)))
+        (source / "kit" / "kit.css").write_text("a { background: url(icons/home.svg) }\n" * 100)
+        overrides = override_settings(
+            STATIC_ROOT=static_root,
+            STATICFILES_DIRS=[source],
+            INSTALLED_APPS=["django.contrib.staticfiles", "skillup_app"],
+            SKILLUP_SVG_SPRITES=["kit"],
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(clear_caches)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        clear_caches()
+        self.root = Path(settings.STATIC_ROOT)
+        self.paths = json.loads((self.root / "staticfiles.json").read_text())["paths"]
+
+    def test_collect_fingerprints_compresses_and_builds_sprite(self):
+        css = self.paths["kit/kit.css"]
+        self.assertIn(self.paths["kit/icons/home.svg"].removeprefix("kit/"), (self.root / css).read_text())
+        self.assertEqual(gzip.decompress((self.root / f"{css}.gz").read_bytes()), (self.root / css).read_bytes())
+        sprite = (self.root / self.paths["kit/icons-sprite.svg"]).read_text()
+        self.assertEqual(re.findall(r'<symbol id="(\w+)" viewBox="0 0 24 24" fill="none"', sprite), ["home", "print"])
+
+    def test_serves_precompressed_variant_with_immutable_caching(self):
+        url = f"/static/{self.paths['kit/kit.css']}"
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        refused = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_ENCODING="*;q=0.5")["Content-Encoding"], "gzip")
+        self.assertNotIn("immutable", self.client.get("/static/kit/kit.css")["Cache-Control"])
+        self.assertEqual(self.client.get("/static/../manage.py").status_code, 404)
+
+    def test_uncollected_files_fall_back_to_unhashed_urls(self):
+        self.assertEqual(static("admin/css/base.css"), "/static/admin/css/base.css")
+
+
+class ExportTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", is_staff=True)
+        profiled = User.objects.create(username="profiled")
+        Profile.objects.create(user=profiled, position=Profile.POSITION_DB, department=Profile.DEPT_CIT, lab_part=Profile.LAB_C01)
+        bare = User.objects.create(username="bare")
+        template = create_template(title="Lab 1")
+        cls.first = Assignment.objects.create(template=template, student=profiled)
+        cls.second = Assignment.objects.create(template=template, student=bare)
+
+    def export(self, fmt):
+        self.client.force_login(self.admin)
+        response = self.client.get(f"/assignments/export/{fmt}/")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_includes_profile_columns(self):
+        rows = list(csv.reader(self.export("csv").splitlines()))
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        first, second = (dict(zip(rows[0], row)) for row in rows[1:])
+        self.assertEqual((first["student_username"], first["position"], first["department"], first["lab_part"]),
+                         ("profiled", Profile.POSITION_DB, Profile.DEPT_CIT, Profile.LAB_C01))
+        self.assertEqual((second["student_username"], second["position"], second["department"], second["lab_part"]),
+                         ("bare", "", "", ""))
+
+    def test_ndjson_rows(self):
+        records = [json.loads(line) for line in self.export("ndjson").splitlines()]
+        self.assertEqual([r["id"] for r in records], [self.first.id, self.second.id])
+        self.assertEqual(list(records[0]), EXPORT_COLUMNS)
+        self.assertEqual(records[0]["template_title"], "Lab 1")
+        self.assertIsNone(records[1]["position"])
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get("/assignments/export/csv/")
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body, await sync_to_async(self.export)("csv"))
+
+    def test_export_is_admin_only(self):
+        self.client.force_login(User.objects.create(username="student"))
+        self.assertEqual(self.client.get("/assignments/export/csv/").status_code, 403)
+
+
+class JobQueueTests(MediaTestCase):
+    def setUp(self):
+        self.calls = 0
+
+        @job_handler("test.flaky")
+        def flaky(job, fail=True):
+            self.calls += 1
+            if fail:
+                raise RuntimeError("boom")
+            return {"ok": True}
+        self.addCleanup(JOB_HANDLERS.pop, "test.flaky")
+
+    def make_runnable(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def test_claims_never_overlap(self):
+        jobs = [enqueue("test.flaky") for _ in range(3)]
+        claimed = [claim_next() for _ in range(4)]
+        self.assertEqual(sorted(claimed[:3]), sorted(job.pk for job in jobs))
+        self.assertIsNone(claimed[3])
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = enqueue("test.flaky", max_attempts=3)
+        for attempt in (1, 2):
+            self.assertEqual(claim_next(), job.pk)
+            before = timezone.now()
+            with self.assertLogs("skillup_app.jobs", "ERROR"):
+                self.assertEqual(run_job(job.pk), Job.STATUS_QUEUED)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertGreaterEqual(job.run_after, before + timedelta(seconds=RETRY_BACKOFF_SECONDS * attempt))
+            self.assertIsNone(claim_next())  # backing off
+            self.make_runnable(job)
+        self.assertEqual(claim_next(), job.pk)
+        with self.assertLogs("skillup_app.jobs", "ERROR"):
+            self.assertEqual(run_job(job.pk), Job.STATUS_FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, self.calls), (3, 3))
+        self.assertIn("RuntimeError: boom", job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_expired_lease_is_requeued_and_counts_as_attempt(self):
+        job = enqueue("test.flaky", {"fail": False}, max_attempts=2)
+        self.assertEqual(claim_next(), job.pk)
+        # The worker dies without recording anything.
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs("skillup_app.jobs", "WARNING"):
+            self.assertIsNone(claim_next())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertIn("lease expired", job.error)
+
+        self.make_runnable(job)
+        self.assertEqual(claim_next(), job.pk)
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs("skillup_app.jobs", "WARNING"):
+            claim_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+
+    def test_progress_renews_lease(self):
+        job = enqueue("test.flaky")
+        claim_next()
+        job.refresh_from_db()
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now())
+        job.set_progress(1, 2)
+        job.refresh_from_db()
+        self.assertGreater(job.locked_until, timezone.now() + timedelta(seconds=Job.LEASE_SECONDS - 60))
+        self.assertEqual(job.progress, 50)
+
+    def test_stale_attempt_cannot_overwrite_newer_one(self):
+        @job_handler("test.slow")
+        def slow(job):
+            # The lease expires mid-run and another worker claims the job again.
+            Job.objects.filter(pk=job.pk).update(attempts=F("attempts") + 1)
+        self.addCleanup(JOB_HANDLERS.pop, "test.slow")
+
+        job = enqueue("test.slow")
+        claim_next()
+        with self.assertLogs("skillup_app.jobs", "WARNING"):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+
+    def test_assign_endpoint_queues_job_visible_to_owner_only(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        template = create_template()
+        self.client.force_login(admin)
+        response = self.client.post(f"/templates/{template.pk}/assign/", {"department": Profile.DEPT_CST},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+        self.assertEqual(Job.objects.get(pk=job_id).payload, {"template_id": template.pk, "department": Profile.DEPT_CST})
+        self.assertEqual(self.client.get(f"/jobs/{job_id}/").json()["status"], Job.STATUS_QUEUED)
+
+        self.client.force_login(User.objects.create(username="other"))
+        self.assertEqual(self.client.get(f"/jobs/{job_id}/").status_code, 404)
+        self.assertEqual(self.client.post(f"/templates/{template.pk}/assign/", {"department": Profile.DEPT_CST},
+                                          content_type="application/json").status_code, 403)
+
+    def test_assign_job_publishes_created_events_for_new_assignments_only(self):
+        template = create_template()
+        assigned, new = User.objects.create(username="assigned"), User.objects.create(username="new")
+        Assignment.objects.create(template=template, student=assigned)
+        job = enqueue("assign_template", {"template_id": template.pk, "student_ids": [assigned.pk, new.pk]})
+        self.assertEqual(claim_next(), job.pk)
+        with mock.patch("skillup_app.tasks.publish_to_users") as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_job(job.pk), Job.STATUS_DONE)
+        created = Assignment.objects.get(template=template, student=new)
+        publish.assert_called_once_with([new.pk], "assignment.created",
+                                        {"id": created.pk, "template": template.pk, "status": created.status})
+
+
+class EventStreamTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(username="student")
+        cls.template = create_template()
+
+    def assign(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Assignment.objects.create(template=self.template, student=self.student)
+
+    async def test_stream_delivers_assignment_events(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get("/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+            assignment = await sync_to_async(self.assign)()
+            event = (await asyncio.wait_for(anext(chunks), 5)).decode()
+        finally:
+            await chunks.aclose()
+        self.assertTrue(event.startswith("event: assignment.created\n"))
+        self.assertEqual(json.loads(event.split("data: ", 1)[1])["id"], assignment.id)
+
+    async def test_access_token_in_query_string(self):
+        token = await sync_to_async(lambda: str(ClaimsTokenObtainPairSerializer.get_token(self.student).access_token))()
+        response = await self.async_client.get("/events/", {"access": token})
+        self.assertEqual(response.status_code, 200)
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+        await chunks.aclose()
+
+    async def test_unauthenticated_or_bad_token(self):
+        self.assertEqual((await self.async_client.get("/events/")).status_code, 401)
+        self.assertEqual((await self.async_client.get("/events/", {"access": "nope"})).status_code, 401)
+
+    def test_wsgi_is_not_implemented(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get("/events/").status_code, 501)
+
+
+class BatchTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(username="student")
+        cls.template = create_template("# Lab\n\n## Setup\n")
+        Assignment.objects.create(template=cls.template, student=cls.student)
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def batch(self, *paths):
+        return self.client.post("/batch/", {"requests": [{"path": path} for path in paths]},
+                                content_type="application/json")
+
+    def test_results_in_request_order(self):
+        paths = [f"/templates/{self.template.pk}/outline/", "/assignments/my/", "/assignments/export/csv/",
+                 "/no/such/path/", "/templates/999999/"]
+        response = self.batch(*paths)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["responses"]
+        self.assertEqual([r["path"] for r in results], paths)
+        self.assertEqual([r["status"] for r in results], [200, 200, 403, 404, 404])
+        self.assertEqual([e["anchor"] for e in results[0]["body"]["outline"]], ["lab", "setup"])
+        self.assertEqual(len(results[1]["body"]), 1)
+
+    def test_non_api_views_are_refused_without_running(self):
+        results = self.batch("/admin/", "/events/", "/batch/", "/swagger.json").json()["responses"]
+        self.assertEqual([r["status"] for r in results], [400] * 4)
+        calls = []
+
+        def plain_view(request):
+            calls.append(request)
+        with mock.patch("skillup_app.views.resolve", return_value=ResolverMatch(plain_view, (), {})):
+            self.assertEqual(self.batch("/plain/").json()["responses"][0]["status"], 400)
+        self.assertEqual(calls, [])
+
+    def test_streaming_api_responses_are_refused(self):
+        self.client.force_login(User.objects.create(username="admin", is_staff=True))
+        with mock.patch("skillup_app.views.iter_assignment_rows") as rows:
+            result = self.batch("/assignments/export/csv/").json()["responses"][0]
+        self.assertEqual((result["status"], result["body"]), (400, {"detail": "This endpoint cannot be batched."}))
+        rows.return_value.__iter__.assert_not_called()
+
+    def test_failing_sub_request_does_not_fail_batch(self):
+        with mock.patch.object(TaskTemplateViewSet, "outline", side_effect=RuntimeError("boom")), \
+                self.assertLogs("skillup_app.views", "ERROR"):
+            results = self.batch(f"/templates/{self.template.pk}/outline/", "/assignments/my/").json()["responses"]
+        self.assertEqual([r["status"] for r in results], [500, 200])
+
+    def test_item_limit(self):
+        self.assertEqual(self.batch(*["/assignments/my/"] * 20).status_code, 200)
+        self.assertEqual(self.batch(*["/assignments/my/"] * 21).status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        self.assertEqual(self.batch("/assignments/my/").status_code, 401)
+
+
+class ClaimsAuthenticationTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="student", password="old-secret")
+        Profile.objects.create(user=cls.user, position=Profile.POSITION_SWE, department=Profile.DEPT_CST)
+        cls.template = create_template()
+        Assignment.objects.create(template=cls.template, student=cls.user)
+
+    def setUp(self):
+        _user_state_cache.clear()
+        self.refresh = ClaimsTokenObtainPairSerializer.get_token(self.user)
+
+    def get(self, path, token=None):
+        token = token or self.refresh.access_token
+        return self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_reads_use_claims_and_cached_user_state(self):
+        with self.assertNumQueries(2):  # user state + assignments
+            response = self.get("/assignments/my/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get("/assignments/my/").status_code, 200)
+
+    def test_user_state_cache_drops_expired_and_excess_entries(self):
+        other = User.objects.create(username="other")
+        with mock.patch("skillup_app.authentication.time.monotonic", return_value=1000.0):
+            _user_state(self.user.pk)
+        with mock.patch("skillup_app.authentication.time.monotonic", return_value=2000.0):
+            _user_state(other.pk)
+        self.assertEqual(list(_user_state_cache), [other.pk])
+        with mock.patch("skillup_app.authentication.USER_STATE_CACHE_SIZE", 1):
+            _user_state(self.user.pk)
+        self.assertEqual(list(_user_state_cache), [self.user.pk])
+
+    def test_password_change_revokes_tokens(self):
+        self.user.set_password("new-secret")
+        self.user.save()
+        response = self.get("/assignments/my/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["detail"], "The user's password has been changed.")
+
+    def test_inactive_user_is_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get("/assignments/my/").status_code, 401)
+
+    def test_staff_change_falls_back_to_database_user_until_refresh(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.get("/assignments/export/csv/")
+        self.assertEqual(response.status_code, 200)  # loaded from the database, so staff already
+        self.assertEqual(self.get("/assignments/my/").status_code, 200)
+
+        refreshed = self.client.post("/token/refresh/", {"refresh": str(self.refresh)}, content_type="application/json")
+        self.assertEqual(refreshed.status_code, 200)
+        with self.assertNumQueries(1):  # back on the claims-only path, user state cached
+            self.assertEqual(self.get("/assignments/my/", refreshed.json()["access"]).status_code, 200)
+
+    def test_refresh_reloads_profile_claims(self):
+        Profile.objects.filter(user=self.user).update(lab_part=Profile.LAB_C02)
+        access = self.client.post("/token/refresh/", {"refresh": str(self.refresh)},
+                                  content_type="application/json").json()["access"]
+        self.assertEqual(AccessToken(access)["lab_part"], Profile.LAB_C02)
+
+    def test_writes_load_the_real_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.refresh = ClaimsTokenObtainPairSerializer.get_token(User.objects.get(pk=self.user.pk))
+        response = self.client.post(f"/templates/{self.template.pk}/assign/", {"student_ids": [self.user.pk]},
+                                    content_type="application/json",
+                                    HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get(pk=response.json()["id"]).created_by, self.user)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class UserImportTests(TestCase):
+    CSV = (
+        "username,password,position,department,lab_part\n"
+        "ana,pw-ana,SOFTWARE_DEV,CST,C01\n"
+        "ben,pw-ben,DEVOPS,,\n"
+        "taken,pw-taken,OTHER,,\n"
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        private_root = tempfile.mkdtemp(prefix="skillup-private-")
+        cls.addClassCleanup(shutil.rmtree, private_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(STORAGES={**settings.STORAGES, "private": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": private_root},
+        }}))
+        super().setUpClass()
+
+    def test_parse_rows_reports_invalid_and_duplicate_lines(self):
+        rows, errors = parse_rows(self.CSV + "ana,again,OTHER,,\ncid,pw,NOT_A_POSITION,,\ndee,,OTHER,,\n")
+        self.assertEqual([row["username"] for row in rows], ["ana", "ben", "taken"])
+        self.assertEqual([error["line"] for error in errors], [5, 6, 7])
+        self.assertIn("Duplicate", errors[0]["errors"]["username"][0])
+        self.assertIn("position", errors[1]["errors"])
+        self.assertIn("password", errors[2]["errors"])
+
+    def test_import_creates_profiles_and_skips_existing_users(self):
+        User.objects.create(username="taken")
+        rows, _ = parse_rows(self.CSV)
+        progress = []
+        result = import_users(rows, workers=1, batch_size=1, progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(result, {"created": 2, "skipped": ["taken"]})
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        ana = User.objects.select_related("profile").get(username="ana")
+        self.assertTrue(ana.check_password("pw-ana"))
+        self.assertEqual((ana.profile.position, ana.profile.department, ana.profile.lab_part),
+                         (Profile.POSITION_SWE, Profile.DEPT_CST, Profile.LAB_C01))
+        self.assertIsNone(User.objects.get(username="ben").profile.department)
+        self.assertFalse(Profile.objects.filter(user__username="taken").exists())
+
+    def test_bulk_register_queues_job_without_passwords_in_payload(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post("/auth/register/bulk/", {"file": SimpleUploadedFile("users.csv", self.CSV.encode())})
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.json()["id"])
+        self.assertEqual(list(job.payload), ["upload"])
+        self.assertNotIn("pw-ana", json.dumps(job.payload))
+        self.assertTrue(storages["private"].exists(job.payload["upload"]))
+        self.assertFalse(User.objects.filter(username="ana").exists())
+
+        self.assertEqual(claim_next(), job.pk)
+        with override_settings(SKILLUP_IMPORT_WORKERS=2), \
+                mock.patch("skillup_app.tasks.import_users", wraps=import_users) as wrapped:
+            self.assertEqual(run_job(job.pk), Job.STATUS_DONE)
+        self.assertEqual(wrapped.call_args.kwargs["workers"], 2)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {"created": 3, "skipped": []})
+        self.assertTrue(User.objects.get(username="ben").check_password("pw-ben"))
+        self.assertFalse(storages["private"].exists(job.payload["upload"]))
+
+    def test_bulk_register_rejects_invalid_csv(self):
+        self.client.force_login(User.objects.create(username="admin", is_staff=True))
+        response = self.client.post("/auth/register/bulk/",
+                                    {"file": SimpleUploadedFile("users.csv", b"username,password,position\nx,,OTHER\n")})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+
+class AdminTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="pw")
+        cls.templates = [create_template(title=f"t{i}") for i in range(2)]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_students(self, count, start=0):
+        users = User.objects.bulk_create([User(username=f"s{start + i}") for i in range(count)])
+        Profile.objects.bulk_create([Profile(user=u, position=Profile.POSITION_SWE) for u in users])
+        Assignment.objects.bulk_create([Assignment(template=self.templates[0], student=u) for u in users])
+        return users
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_students(3)
+        urls = ["/admin/skillup_app/assignment/", "/admin/skillup_app/profile/",
+                "/admin/skillup_app/tasktemplate/", "/admin/skillup_app/modifiedmarkdownfile/", "/admin/skillup_app/job/"]
+        few = [self.changelist_queries(url) for url in urls]
+        self.add_students(30, start=3)
+        Job.objects.bulk_create([Job(name="assign_template", created_by=self.admin) for _ in range(30)])
+        self.assertEqual([self.changelist_queries(url) for url in urls], few)
+
+    def test_large_changelist_uses_estimated_count(self):
+        self.add_students(20)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        with mock.patch("skillup_app.paginators.ESTIMATE_THRESHOLD", 10), \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(EstimatedCountPaginator(Assignment.objects.all(), 10).count, 20)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries.captured_queries))
+        self.assertEqual(EstimatedCountPaginator(Assignment.objects.filter(status="DONE"), 10).count, 0)
+
+    def test_mark_done_updates_and_publishes(self):
+        students = self.add_students(3)
+        done = Assignment.objects.filter(student=students[0])
+        done.update(status=Assignment.STATUS_DONE)
+        selected = list(Assignment.objects.values_list("pk", flat=True))
+        with mock.patch("skillup_app.admin.publish_to_users") as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/skillup_app/assignment/",
+                                        {"action": "mark_done", "_selected_action": selected}, follow=True)
+        self.assertContains(response, "Marked 2 assignment(s) as done.")
+        self.assertFalse(Assignment.objects.exclude(status=Assignment.STATUS_DONE).exists())
+        self.assertFalse(Assignment.objects.filter(completed_at__isnull=True).exclude(pk=done.get().pk).exists())
+        self.assertEqual(sorted(call.args[0][0] for call in publish.call_args_list), [s.pk for s in students[1:]])
+
+    def test_assign_to_cohort_confirms_then_queues_jobs(self):
+        selected = [t.pk for t in self.templates]
+        url = "/admin/skillup_app/tasktemplate/"
+        response = self.client.post(url, {"action": "assign_to_cohort", "_selected_action": selected})
+        self.assertTemplateUsed(response, "admin/skillup_app/tasktemplate/assign_cohort.html")
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post(url, {"action": "assign_to_cohort", "_selected_action": selected, "apply": "1"})
+        self.assertTemplateUsed(response, "admin/skillup_app/tasktemplate/assign_cohort.html")  # no filter picked
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post(url, {"action": "assign_to_cohort", "_selected_action": selected, "apply": "1",
+                                          "department": Profile.DEPT_CIT}, follow=True)
+        self.assertContains(response, "Queued cohort assignment for 2 template(s).")
+        self.assertEqual(sorted(Job.objects.values_list("payload", flat=True), key=lambda p: p["template_id"]),
+                         [{"template_id": pk, "department": Profile.DEPT_CIT} for pk in sorted(selected)])
+        self.assertEqual(set(Job.objects.values_list("created_by", flat=True)), {self.admin.pk})
@@ -1,9 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
-    RegisterView, UploadedMarkdownFileUploadView,
+    RegisterView, BulkRegisterView, UploadedMarkdownFileUploadView,
     UploadedMarkdownFileViewSet, ModifiedMarkdownFileViewSet,
-    TaskTemplateViewSet, AssignmentViewSet,
+    TaskTemplateViewSet, AssignmentViewSet, JobViewSet,
+    event_stream, batch_view,
 )
 
 router = DefaultRouter()
@@ -11,9 +13,15 @@ router.register(r"uploaded-md", UploadedMarkdownFileViewSet, basename="uploaded-
 router.register(r"modified-md", ModifiedMarkdownFileViewSet, basename="modified-md")
 router.register(r"templates", TaskTemplateViewSet, basename="templates")
 router.register(r"assignments", AssignmentViewSet, basename="assignments")
+router.register(r"jobs", JobViewSet, basename="jobs")
 
 urlpatterns = [
     path("auth/register/", RegisterView.as_view(), name="register"),
+    path("auth/register/bulk/", BulkRegisterView.as_view(), name="register-bulk"),
+    path("token/", TokenObtainPairView.as_view(), name="token-obtain"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path("uploaded-md/upload/", UploadedMarkdownFileUploadView.as_view(), name="uploaded-md-upload"),
+    path("events/", event_stream, name="events"),
+    path("batch/", batch_view, name="batch"),
     path("", include(router.urls)),
 ]
@@ -1,13 +1,42 @@
-import markdown as md
+import gzip
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+MARKDOWN_EXTENSIONS = [
+    'extra',
+    'codehilite',
+    'sane_lists',
+    'toc',
+]
+
+_local = threading.local()
+
+
+def _markdown_renderer():
+    # markdown and its extensions (codehilite pulls in Pygments lexers and
+    # formatters) are only imported once something is actually rendered, and
+    # the configured instance is reused per thread instead of rebuilt per call.
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        import markdown as md
+        renderer = _local.renderer = md.Markdown(extensions=MARKDOWN_EXTENSIONS, output_format='html5')
+    return renderer
+
 
 def render_markdown(text: str) -> str:
-    return md.markdown(
-        text or '',
-        extensions=[
-            'extra',
-            'codehilite',
-            'sane_lists',
-            'toc',
-        ],
-        output_format='html5',
-    )
+    renderer = _markdown_renderer()
+    try:
+        return renderer.convert(text or '')
+    finally:
+        renderer.reset()
+
+
+def compressed_variants(body: bytes):
+    """Yield (suffix, data) for the precompressed copies of ``body`` a web server can serve."""
+    yield '.gz', gzip.compress(body, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(body, quality=11)
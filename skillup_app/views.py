@@ -1,24 +1,95 @@
+import logging
+import uuid
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
+from django.urls import Resolver404, resolve
 from rest_framework import generics, viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed, NotFound
 
-from .models import UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment
+from .models import UploadedMarkdownFile, ModifiedMarkdownFile, TaskTemplate, Assignment, Job
 from .serializers import (
     RegistrationSerializer,
     UploadedMarkdownFileSerializer, ModifiedMarkdownFileSerializer,
     TaskTemplateSerializer, AssignmentSerializer, MyAssignmentSerializer,
+    CohortSerializer, JobSerializer, BatchSerializer,
 )
 from .permissions import IsAssignee
+from .authentication import ClaimsJWTAuthentication
+from .db_router import replica_reads
+from .exports import EXPORT_FORMATS, aiter_blocks, iter_assignment_rows
+from .jobs import enqueue
+from .onboarding import parse_rows
+from .events import format_sse, get_broker, user_channel
+from .outline import render_section
+from .publishing import bundle_url
+from .utils import render_markdown
+
+logger = logging.getLogger(__name__)
+
+SECTION_CACHE_SECONDS = 60 * 60 * 24
+
+
+def outline_response(obj_id, modified):
+    return Response({"id": obj_id, "revision": modified.content_hash, "outline": modified.outline})
+
+
+def section_response(obj_id, modified, anchor):
+    entry = next((e for e in modified.outline if e["anchor"] == anchor), None)
+    if entry is None:
+        raise NotFound("No section with that anchor.")
+    # The revision hash is part of the key, so edits never serve a stale section.
+    key = f"skillup:section:{modified.pk}:{modified.content_hash}:{anchor}"
+    html = cache.get(key)
+    if html is None:
+        html = render_section(modified.content, modified.outline, entry)
+        cache.set(key, html, SECTION_CACHE_SECONDS)
+    return Response({"id": obj_id, "revision": modified.content_hash, "anchor": anchor,
+                     "title": entry["title"], "level": entry["level"], "html": html})
 
 
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegistrationSerializer
 
 
+class BulkRegisterView(APIView):
+    """Admin endpoint to register many users from an uploaded CSV file.
+
+    Rows are validated here; creating the accounts (and hashing every password)
+    runs as an ``import_users`` job. The CSV waits in the private storage, so
+    passwords never reach the job table.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": ["No CSV file uploaded."]}, status=status.HTTP_400_BAD_REQUEST)
+        content = upload.read()
+        rows, errors = parse_rows(content.decode("utf-8-sig"))
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        name = storages["private"].save(f"imports/{uuid.uuid4().hex}.csv", ContentFile(content))
+        job = enqueue("import_users", {"upload": name}, user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
 class UploadedMarkdownFileUploadView(generics.CreateAPIView):
     """Admin endpoint to upload one or multiple .md files."""
+    serializer_class = UploadedMarkdownFileSerializer
     permission_classes = [IsAdminUser]
     parser_classes = [MultiPartParser, FormParser]
 
@@ -35,7 +106,15 @@ class UploadedMarkdownFileUploadView(generics.CreateAPIView):
         return Response(created, status=status.HTTP_201_CREATED)
 
 
-class UploadedMarkdownFileViewSet(viewsets.ReadOnlyModelViewSet):
+class ReplicaReadMixin:
+    """Serve read-only actions from the read replica, if one is configured."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(request.method in SAFE_METHODS):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class UploadedMarkdownFileViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = UploadedMarkdownFile.objects.all()
     serializer_class = UploadedMarkdownFileSerializer
     permission_classes = [IsAuthenticated]
@@ -46,7 +125,7 @@ class UploadedMarkdownFileViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({"id": obj.id, "title": obj.title, "content": obj.read_text()})
 
 
-class ModifiedMarkdownFileViewSet(viewsets.ModelViewSet):
+class ModifiedMarkdownFileViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = ModifiedMarkdownFile.objects.select_related("original").all()
     serializer_class = ModifiedMarkdownFileSerializer
 
@@ -57,30 +136,76 @@ class ModifiedMarkdownFileViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return super().get_permissions()
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ["outline", "section"]:
+            # Content is only loaded when a section is not cached yet.
+            qs = qs.defer("content")
+        return qs
+
     @action(detail=True, methods=["get"])
     def render(self, request, pk=None):
         obj = self.get_object()
         ser = self.get_serializer(obj)
         return Response({"id": obj.id, "html": ser.data.get("rendered_html")})
 
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
+    def outline(self, request, pk=None):
+        obj = self.get_object()
+        return outline_response(obj.id, obj)
+
+    @action(detail=True, methods=["get"], url_path=r"sections/(?P<anchor>[-\w]+)", permission_classes=[IsAuthenticated])
+    def section(self, request, pk=None, anchor=None):
+        obj = self.get_object()
+        return section_response(obj.id, obj, anchor)
+
 
-class TaskTemplateViewSet(viewsets.ModelViewSet):
+class TaskTemplateViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = TaskTemplate.objects.select_related("modified").all()
     serializer_class = TaskTemplateSerializer
 
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action in ["create", "update", "partial_update", "destroy", "assign"]:
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ["outline", "section"]:
+            qs = qs.defer("modified__content")
+        return qs
+
     @action(detail=True, methods=["get"])
     def render(self, request, pk=None):
         obj = self.get_object()
-        ser = self.get_serializer(obj)
-        return Response({"id": obj.id, "html": ser.data.get("rendered_html")})
+        url = bundle_url(obj)
+        if url:
+            return Response({"id": obj.id, "bundle_url": request.build_absolute_uri(url)})
+        return Response({"id": obj.id, "html": render_markdown(obj.modified.content)})
 
+    @action(detail=True, methods=["get"])
+    def outline(self, request, pk=None):
+        """Heading outline of the template's document, for fetching single sections."""
+        obj = self.get_object()
+        return outline_response(obj.id, obj.modified)
+
+    @action(detail=True, methods=["get"], url_path=r"sections/(?P<anchor>[-\w]+)")
+    def section(self, request, pk=None, anchor=None):
+        """One section of the template's document, rendered on demand and cached per revision."""
+        obj = self.get_object()
+        return section_response(obj.id, obj.modified, anchor)
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=["post"], permission_classes=[IsAdminUser])
+    def assign(self, request, pk=None):
+        """Queue a bulk assignment of this template to a cohort of students."""
+        obj = self.get_object()
+        cohort = CohortSerializer(data=request.data)
+        cohort.is_valid(raise_exception=True)
+        job = enqueue("assign_template", {"template_id": obj.id, **cohort.validated_data}, user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AssignmentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.select_related("template", "student", "template__modified").all()
     serializer_class = AssignmentSerializer
 
@@ -91,10 +216,28 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return super().get_permissions()
 
+    def get_queryset(self):
+        if self.action == "my_assignments":
+            return Assignment.objects.filter(student_id=self.request.user.id).select_related("template__modified")
+        return super().get_queryset()
+
     @action(detail=False, methods=["get"], url_path="my")
     def my_assignments(self, request):
-        qs = Assignment.objects.filter(student=request.user).select_related("template__modified")
-        return Response(MyAssignmentSerializer(qs, many=True).data)
+        qs = self.get_queryset()
+        return Response(MyAssignmentSerializer(qs, many=True, context={"request": request}).data)
+
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<fmt>csv|ndjson)", permission_classes=[IsAdminUser])
+    def export(self, request, fmt=None):
+        """Stream every assignment with its student's profile as CSV or NDJSON."""
+        writer, content_type = EXPORT_FORMATS[fmt]
+        # The body is read after dispatch has left replica_reads, so pin the alias it picked now.
+        rows = iter_assignment_rows(Assignment.objects.using(router.db_for_read(Assignment)))
+        lines = writer(rows)
+        if isinstance(request._request, ASGIRequest):
+            lines = aiter_blocks(lines)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="assignments.{fmt}"'
+        return response
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsAssignee])
     def start(self, request, pk=None):
@@ -106,4 +249,126 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     def done(self, request, pk=None):
         obj = self.get_object()
         obj.complete()
-        return Response({"id": obj.id, "status": obj.status})
\ No newline at end of file
+        return Response({"id": obj.id, "status": obj.status})
+
+
+class JobViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = Job.objects.all()
+        if getattr(self, "swagger_fake_view", False):
+            return qs
+        if not self.request.user.is_staff:
+            qs = qs.filter(created_by_id=self.request.user.id)
+        return qs
+
+
+class BatchView(APIView):
+    """Run several read-only API requests in one round trip.
+
+    The caller is authenticated once; every sub-request reuses that user and
+    the request's database connection.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ser = BatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        results = [self._dispatch(request, item) for item in ser.validated_data["requests"]]
+        return Response({"responses": results})
+
+    def _dispatch(self, request, item):
+        url = urlsplit(item["path"])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {"path": item["path"], "status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+        view_class = getattr(match.func, "cls", None)
+        # Only DRF views return data that can be embedded; anything else (admin,
+        # Swagger, the event stream, this view) is refused before it runs.
+        if not (isinstance(view_class, type) and issubclass(view_class, APIView)) or view_class is BatchView:
+            return {"path": item["path"], "status": status.HTTP_400_BAD_REQUEST,
+                    "body": {"detail": "This endpoint cannot be batched."}}
+
+        sub = HttpRequest()
+        sub.method = item["method"]
+        sub.path = sub.path_info = url.path
+        sub.META = {**request._request.META, "REQUEST_METHOD": item["method"], "QUERY_STRING": url.query}
+        sub.GET = QueryDict(url.query)
+        sub.COOKIES = request._request.COOKIES
+        sub.user = request.user
+        sub.resolver_match = match
+        # Picked up by DRF's Request so the sub-view skips authentication.
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+
+        try:
+            response = match.func(sub, *match.args, **match.kwargs)
+        except Http404:
+            return {"path": item["path"], "status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+        except Exception:
+            # One broken sub-request must not fail the others.
+            logger.exception("Batched request to %s failed", item["path"])
+            return {"path": item["path"], "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "body": {"detail": "Internal server error."}}
+        if response.streaming or not hasattr(response, "data"):
+            # A DRF view may still answer with a plain or streaming response (the exports).
+            response.close()
+            return {"path": item["path"], "status": status.HTTP_400_BAD_REQUEST,
+                    "body": {"detail": "This endpoint cannot be batched."}}
+        return {"path": item["path"], "status": response.status_code, "body": response.data}
+
+
+batch_view = BatchView.as_view()
+
+
+SSE_HEARTBEAT_SECONDS = 15
+
+
+async def _event_stream_user(request):
+    # EventSource cannot send an Authorization header, so besides the session
+    # cookie an access token may be passed as ?access=<jwt>.
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    raw_token = request.GET.get("access")
+    if not raw_token:
+        return None
+    auth = ClaimsJWTAuthentication()
+    try:
+        token = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_claims_user)(token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def event_stream(request):
+    """Server-Sent Events for the current user's assignments and their templates.
+
+    Only available when served through ``core.asgi`` (e.g. ``uvicorn core.asgi:application``).
+    Under WSGI Django would buffer the endless stream and hold the worker thread
+    forever, so the endpoint answers 501 there and clients keep polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Event streaming requires the ASGI application."},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    user = await _event_stream_user(request)
+    if user is None:
+        return HttpResponse(status=401)
+    subscription = get_broker().subscribe(user_channel(user.id))
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                yield format_sse(event) if event else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -11,6 +11,8 @@
         API_BASE: window.APP_API_BASE || "/api",
         TOKEN_ENDPOINT: "/token/",
         REFRESH_ENDPOINT: "/token/refresh/",
+        EVENTS_ENDPOINT: "/events/",
+        BATCH_ENDPOINT: "/batch/",
         STORAGE_KEY: "skillup_jwt",
         REDIRECT_AFTER_LOGIN: "/", // fallback if login form doesn't set data-redirect
     };
@@ -133,6 +135,68 @@
         }
     }
 
+    // ---- batch: several GETs in one round trip ----
+    async function batch(paths) {
+        const res = await authFetch(CONFIG.API_BASE + CONFIG.BATCH_ENDPOINT, {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({requests: paths.map(path => ({method: "GET", path}))}),
+            credentials: "same-origin",
+        });
+        if (!res.ok) throw new Error("Batch request failed (" + res.status + ")");
+        const data = await res.json();
+        return data.responses;
+    }
+
+    // ---- server-sent events (replaces polling /assignments/my) ----
+    const STREAM_MAX_FAILURES = 5;
+
+    function openEventStream(handlers = {}) {
+        // EventSource can't set headers, so the access token goes in the query string.
+        // The token expires after a few minutes: once the server rejects a reconnect
+        // the browser gives up, so refresh the token and open a new stream ourselves.
+        let source = null;
+        let closed = false;
+        let failures = 0;
+        let timer = null;
+
+        function connect() {
+            const token = getAccessToken();
+            const url = CONFIG.API_BASE + CONFIG.EVENTS_ENDPOINT + (token ? "?access=" + encodeURIComponent(token) : "");
+            source = new EventSource(url, {withCredentials: true});
+            source.onopen = function () {
+                failures = 0;
+            };
+            source.onerror = function () {
+                // Transient drops are retried by the browser; CLOSED means the server refused.
+                if (closed || source.readyState !== EventSource.CLOSED) return;
+                failures += 1;
+                if (failures > STREAM_MAX_FAILURES) return;
+                refreshTokens().catch(function () {
+                }).finally(function () {
+                    if (!closed) timer = setTimeout(connect, Math.min(30000, 1000 * 2 ** (failures - 1)));
+                });
+            };
+            Object.keys(handlers).forEach(function (type) {
+                source.addEventListener(type, function (e) {
+                    handlers[type](JSON.parse(e.data));
+                });
+            });
+        }
+
+        connect();
+        return {
+            get source() {
+                return source;
+            },
+            close() {
+                closed = true;
+                clearTimeout(timer);
+                if (source) source.close();
+            },
+        };
+    }
+
     // ---- form wiring (supports old & new IDs) ----
     function q(id) {
         return document.getElementById(id);
@@ -187,7 +251,7 @@
 
     // ---- expose API ----
     window.Auth = {
-        login, logout, isLoggedIn, getAccessToken, refreshTokens, authFetch, readTokens
+        login, logout, isLoggedIn, getAccessToken, refreshTokens, authFetch, readTokens, openEventStream, batch
     };
 
     document.addEventListener("DOMContentLoaded", wireLoginForm);